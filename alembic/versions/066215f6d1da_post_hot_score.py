@@ -0,0 +1,32 @@
+"""post hot score
+
+Revision ID: 066215f6d1da
+Revises: aff587e18399
+Create Date: 2026-10-18 12:05:11.482310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '066215f6d1da'
+down_revision: Union[str, None] = 'aff587e18399'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('hot', sa.Float(), sa.Computed(
+        "sign(upvotes - downvotes) * log(greatest(abs(upvotes - downvotes), 1))"
+        " + (extract(epoch FROM created) - 1134028003) / 45000",
+        persisted=True,
+    ), nullable=True))
+    op.create_index('ix_posts_hot_id', 'posts', ['hot', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_posts_hot_id', table_name='posts')
+    op.drop_column('posts', 'hot')
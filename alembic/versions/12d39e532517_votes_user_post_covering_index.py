@@ -0,0 +1,29 @@
+"""votes user post covering index
+
+Revision ID: 12d39e532517
+Revises: 066215f6d1da
+Create Date: 2026-10-18 13:21:40.917253
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '12d39e532517'
+down_revision: Union[str, None] = '066215f6d1da'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_votes_user_id_post_id', 'votes', ['user_id', 'post_id'],
+        unique=False, postgresql_include=['type'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_votes_user_id_post_id', table_name='votes')
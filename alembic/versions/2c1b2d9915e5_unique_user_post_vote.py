@@ -0,0 +1,54 @@
+"""unique user post vote
+
+Revision ID: 2c1b2d9915e5
+Revises: ec54011fe87c
+Create Date: 2026-10-18 11:02:17.604125
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c1b2d9915e5'
+down_revision: Union[str, None] = 'ec54011fe87c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Удаляем дубликаты оценок, оставляя самую раннюю
+    op.execute("""
+        DELETE FROM votes
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (PARTITION BY post_id, user_id ORDER BY id) AS position
+                FROM votes
+            ) AS numbered
+            WHERE position > 1
+        )
+    """)
+    # Дубликаты учитывались в счётчиках публикаций, поэтому пересчитываем расходящиеся
+    op.execute("""
+        UPDATE posts
+        SET upvotes = counters.upvotes,
+            downvotes = counters.downvotes,
+            votes_amount = counters.votes_amount
+        FROM (
+            SELECT post_id,
+                   count(*) FILTER (WHERE type = 'upvote') AS upvotes,
+                   count(*) FILTER (WHERE type = 'downvote') AS downvotes,
+                   count(*) AS votes_amount
+            FROM votes
+            GROUP BY post_id
+        ) AS counters
+        WHERE posts.id = counters.post_id
+          AND posts.votes_amount <> counters.votes_amount
+    """)
+    op.create_index('ux_votes_post_id_user_id', 'votes', ['post_id', 'user_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ux_votes_post_id_user_id', table_name='votes')
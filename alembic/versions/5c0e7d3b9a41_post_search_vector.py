@@ -0,0 +1,32 @@
+"""post search vector
+
+Revision ID: 5c0e7d3b9a41
+Revises: 12d39e532517
+Create Date: 2026-10-18 14:20:37.904615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c0e7d3b9a41'
+down_revision: Union[str, None] = '12d39e532517'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('search', postgresql.TSVECTOR(), sa.Computed(
+        "to_tsvector('russian', coalesce(body, ''))",
+        persisted=True,
+    ), nullable=True))
+    op.create_index('ix_posts_search', 'posts', ['search'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_posts_search', table_name='posts', postgresql_using='gin')
+    op.drop_column('posts', 'search')
@@ -0,0 +1,28 @@
+"""feed pagination indexes
+
+Revision ID: aff587e18399
+Revises: 2c1b2d9915e5
+Create Date: 2026-10-18 11:47:53.310264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'aff587e18399'
+down_revision: Union[str, None] = '2c1b2d9915e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_posts_created_id', 'posts', ['created', 'id'], unique=False)
+    op.create_index('ix_posts_rating_id', 'posts', ['rating', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_posts_rating_id', table_name='posts')
+    op.drop_index('ix_posts_created_id', table_name='posts')
@@ -0,0 +1,27 @@
+"""posts author created index
+
+Revision ID: b7e2a91c4d03
+Revises: 5c0e7d3b9a41
+Create Date: 2026-10-18 15:02:18.336041
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2a91c4d03'
+down_revision: Union[str, None] = '5c0e7d3b9a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_posts_author_id_created_id', 'posts', ['author_id', 'created', 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_posts_author_id_created_id', table_name='posts')
@@ -0,0 +1,26 @@
+"""user display name
+
+Revision ID: e41f6a2d8c57
+Revises: b7e2a91c4d03
+Create Date: 2026-10-18 16:10:52.618203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e41f6a2d8c57'
+down_revision: Union[str, None] = 'b7e2a91c4d03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('user', sa.Column('display_name', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('user', 'display_name')
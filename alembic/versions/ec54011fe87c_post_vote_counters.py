@@ -0,0 +1,54 @@
+"""post vote counters
+
+Revision ID: ec54011fe87c
+Revises: 1720e0246a6f
+Create Date: 2026-10-18 10:12:40.215377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ec54011fe87c'
+down_revision: Union[str, None] = '1720e0246a6f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('upvotes', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('posts', sa.Column('downvotes', sa.Integer(), server_default='0', nullable=False))
+    op.add_column(
+        'posts', sa.Column('votes_amount', sa.Integer(), server_default='0', nullable=False)
+    )
+
+    # Заполняем счётчики по уже существующим оценкам
+    op.execute("""
+        UPDATE posts
+        SET upvotes = counters.upvotes,
+            downvotes = counters.downvotes,
+            votes_amount = counters.votes_amount
+        FROM (
+            SELECT post_id,
+                   count(*) FILTER (WHERE type = 'upvote') AS upvotes,
+                   count(*) FILTER (WHERE type = 'downvote') AS downvotes,
+                   count(*) AS votes_amount
+            FROM votes
+            GROUP BY post_id
+        ) AS counters
+        WHERE posts.id = counters.post_id
+    """)
+
+    op.add_column('posts', sa.Column(
+        'rating', sa.Integer(), sa.Computed('upvotes - downvotes', persisted=True), nullable=True
+    ))
+
+
+def downgrade() -> None:
+    op.drop_column('posts', 'rating')
+    op.drop_column('posts', 'votes_amount')
+    op.drop_column('posts', 'downvotes')
+    op.drop_column('posts', 'upvotes')
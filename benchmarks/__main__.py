@@ -0,0 +1,124 @@
+"""
+Нагрузочное тестирование сервиса.
+
+Заполнение БД тестовыми данными:
+    python -m benchmarks seed --users 1000 --posts 10000 --votes 100000 --reset
+
+Прогон сценария:
+    python -m benchmarks run feed --requests 5000 --concurrency 50 --output results.json
+
+Микро-бенчмарк сериализации ленты, БД не нужна:
+    python -m benchmarks serialization --items 100
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from benchmarks.scenarios import SCENARIOS
+from config.config import settings
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="Posting service benchmarks"
+    )
+    parser.add_argument("--pg-host", default=settings.POSTGRES.HOST)
+    parser.add_argument("--pg-port", type=int, default=settings.POSTGRES.PORT)
+    parser.add_argument("--pg-user", default=settings.POSTGRES.USER)
+    parser.add_argument("--pg-password", default=settings.POSTGRES.PASSWORD)
+    parser.add_argument("--pg-db", default=settings.POSTGRES.DB)
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of post popularity")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed = commands.add_parser("seed", help="Fill the database with a synthetic dataset")
+    seed.add_argument("--users", type=int, default=1000)
+    seed.add_argument("--posts", type=int, default=10000)
+    seed.add_argument("--votes", type=int, default=100000)
+    seed.add_argument("--reset", action="store_true", help="Truncate users, posts and votes first")
+
+    run = commands.add_parser("run", help="Run a load scenario against the in-process app")
+    run.add_argument("scenario", choices=sorted(SCENARIOS))
+    run.add_argument("--requests", type=int, default=2000)
+    run.add_argument("--concurrency", type=int, default=50)
+    run.add_argument("--warmup", type=int, default=100)
+    run.add_argument(
+        "--logins", type=int, default=100, help="Amount of seeded users issuing requests"
+    )
+    run.add_argument("--output", help="Write JSON results to this file instead of stdout")
+
+    serialization = commands.add_parser(
+        "serialization", help="Measure per-post cost of feed response serialization"
+    )
+    serialization.add_argument("--items", type=int, default=100, help="Posts per feed page")
+    serialization.add_argument("--repeat", type=int, default=200)
+
+    return parser.parse_args()
+
+
+async def _seed(args: argparse.Namespace) -> dict:
+    # pylint: disable=import-outside-toplevel
+    from benchmarks.seed import seed
+    from src.services.db.base import dispose_engine, get_engine, session_factory
+
+    get_engine()
+    try:
+        async with session_factory() as session:
+            result = await seed(
+                session,
+                users=args.users,
+                posts=args.posts,
+                votes=args.votes,
+                skew=args.skew,
+                reset=args.reset,
+                random_seed=args.random_seed,
+            )
+            await session.commit()
+    finally:
+        await dispose_engine()
+    return result
+
+
+async def _run(args: argparse.Namespace) -> dict:
+    # pylint: disable=import-outside-toplevel
+    from benchmarks.runner import run
+
+    return await run(
+        args.scenario,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        warmup=args.warmup,
+        logins=args.logins,
+        skew=args.skew,
+        random_seed=args.random_seed,
+    )
+
+
+def main() -> None:
+    args = _parse_args()
+    # Движок БД создаётся при первом вызове get_engine() и читает настройки в этот момент,
+    # поэтому настройки подключения задаются до запуска сида и сценариев
+    settings.POSTGRES.HOST = args.pg_host
+    settings.POSTGRES.PORT = args.pg_port
+    settings.POSTGRES.USER = args.pg_user
+    settings.POSTGRES.PASSWORD = args.pg_password
+    settings.POSTGRES.DB = args.pg_db
+
+    if args.command == "serialization":
+        # pylint: disable=import-outside-toplevel
+        from benchmarks import serialization
+        result = serialization.run(args.items, args.repeat)
+    else:
+        result = asyncio.run(_seed(args) if args.command == "seed" else _run(args))
+
+    output = json.dumps(result, indent=2)
+    if getattr(args, "output", None):
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
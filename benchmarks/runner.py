@@ -0,0 +1,151 @@
+import asyncio
+import random
+import statistics
+import subprocess
+import time
+from collections import Counter
+
+import httpx
+from sqlalchemy import event, text
+
+from benchmarks.scenarios import SCENARIOS, Context
+from benchmarks.seed import BENCH_EMAIL, BENCH_PASSWORD
+from main import build_app
+from src.services.db.base import get_engine, session_factory
+
+
+class QueryCounter:
+    """
+    Подсчёт SQL-запросов, выполненных через движок приложения
+    """
+
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, *_) -> None:
+        self.queries += 1
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(get_engine().sync_engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *_) -> None:
+        event.remove(get_engine().sync_engine, "before_cursor_execute", self)
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def _login(client: httpx.AsyncClient, email: str) -> dict[str, str]:
+    response = await client.post("/login", data={"username": email, "password": BENCH_PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def _prepare_context(
+        client: httpx.AsyncClient,
+        logins: int,
+        skew: float,
+        random_seed: int,
+) -> Context:
+    async with session_factory() as session:
+        # Ранг популярности публикации определяется кол-вом её оценок
+        result = await session.execute(text("SELECT id FROM posts ORDER BY votes_amount DESC, id"))
+        post_ids = list(result.scalars())
+        result = await session.execute(
+            text('SELECT email FROM "user" WHERE email LIKE :pattern ORDER BY id LIMIT :limit'),
+            {"pattern": BENCH_EMAIL.format("%"), "limit": logins},
+        )
+        emails = list(result.scalars())
+
+    if not post_ids or not emails:
+        raise RuntimeError("Database is empty, run `python -m benchmarks seed` first")
+
+    return Context(
+        client=client,
+        rng=random.Random(random_seed),
+        post_ids=post_ids,
+        auth_headers=[await _login(client, email) for email in emails],
+        skew=skew,
+    )
+
+
+def _percentile(quantiles: list[float], percent: int) -> float:
+    return round(quantiles[percent - 1] * 1000, 3)
+
+
+async def run(
+        scenario: str,
+        requests: int,
+        concurrency: int,
+        warmup: int,
+        logins: int,
+        skew: float,
+        random_seed: int,
+) -> dict:
+    """
+    Прогон сценария нагрузки против приложения, запущенного в том же процессе.
+    Клиенты работают по замкнутому циклу: каждый отправляет следующий запрос сразу после ответа
+    :param scenario: Название сценария из SCENARIOS
+    :param requests: Кол-во измеряемых запросов
+    :param concurrency: Кол-во одновременных клиентов
+    :param warmup: Кол-во запросов прогрева, не попадающих в статистику
+    :param logins: Кол-во пользователей, от имени которых выполняются запросы
+    :param skew: Показатель распределения Ципфа при выборе публикаций
+    :param random_seed: Зерно генератора случайных чисел
+    :return: Результаты прогона
+    """
+    operation = SCENARIOS[scenario]
+    app = build_app()
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            context = await _prepare_context(client, logins, skew, random_seed)
+
+            for _ in range(warmup):
+                await operation(context)
+
+            latencies: list[float] = []
+            statuses: Counter = Counter()
+            remaining = requests
+
+            async def worker() -> None:
+                nonlocal remaining
+                while remaining > 0:
+                    remaining -= 1
+                    started = time.perf_counter()
+                    response = await operation(context)
+                    latencies.append(time.perf_counter() - started)
+                    statuses[response.status_code] += 1
+
+            with QueryCounter() as counter:
+                started = time.perf_counter()
+                await asyncio.gather(*(worker() for _ in range(concurrency)))
+                duration = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "scenario": scenario,
+        "revision": _git_revision(),
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(latencies) / duration, 1),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 3),
+            "p50": _percentile(quantiles, 50),
+            "p95": _percentile(quantiles, 95),
+            "p99": _percentile(quantiles, 99),
+            "max": round(max(latencies) * 1000, 3),
+        },
+        "queries_per_request": round(counter.queries / len(latencies), 3),
+        "status_codes": {str(status): amount for status, amount in sorted(statuses.items())},
+    }
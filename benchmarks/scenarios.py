@@ -0,0 +1,115 @@
+import random
+import uuid
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+import httpx
+
+from benchmarks.seed import BENCH_PASSWORD, zipf_weights
+
+
+@dataclass
+class Context:
+    """
+    Данные, общие для всех виртуальных клиентов сценария
+    """
+    client: httpx.AsyncClient
+    rng: random.Random
+    # ID публикаций по убыванию популярности
+    post_ids: list[int]
+    # Заголовки авторизации заранее залогиненных пользователей
+    auth_headers: list[dict[str, str]]
+    skew: float
+    weights: list[float] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.weights = zipf_weights(len(self.post_ids), self.skew)
+
+    def popular_post(self) -> int:
+        return self.rng.choices(self.post_ids, self.weights)[0]
+
+    def user(self) -> dict[str, str]:
+        return self.rng.choice(self.auth_headers)
+
+
+# Сценарий выполняет одну операцию клиента и возвращает ответ, по которому считается задержка
+Scenario = Callable[[Context], Awaitable[httpx.Response]]
+
+
+async def feed_read(context: Context) -> httpx.Response:
+    """
+    Чтение ленты: случайная сортировка и размер страницы
+    """
+    return await context.client.get("/posts", params={
+        "sorting": context.rng.choice(["latest", "best", "hot"]),
+        "amount": context.rng.choice([10, 20, 50]),
+    })
+
+
+async def post_read(context: Context) -> httpx.Response:
+    """
+    Чтение одной публикации, выбранной по популярности
+    """
+    return await context.client.get(f"/post/{context.popular_post()}")
+
+
+async def hot_post_vote(context: Context) -> httpx.Response:
+    """
+    Шторм оценок: все клиенты голосуют за одну самую популярную публикацию
+    """
+    action = context.rng.choice(["upvote", "downvote", "cancel-vote"])
+    return await context.client.post(
+        f"/post/{context.post_ids[0]}/{action}", headers=context.user()
+    )
+
+
+async def popular_post_vote(context: Context) -> httpx.Response:
+    """
+    Оценка публикации, выбранной по популярности
+    """
+    action = context.rng.choice(["upvote", "downvote", "cancel-vote"])
+    return await context.client.post(
+        f"/post/{context.popular_post()}/{action}", headers=context.user()
+    )
+
+
+async def create_post(context: Context) -> httpx.Response:
+    """
+    Создание публикации
+    """
+    return await context.client.post(
+        "/post", json={"body": "Benchmark post"}, headers=context.user()
+    )
+
+
+async def mixed(context: Context) -> httpx.Response:
+    """
+    Смешанная нагрузка: 50% лента, 30% публикация, 15% оценки, 5% создание публикаций
+    """
+    operation = context.rng.choices(
+        [feed_read, post_read, popular_post_vote, create_post],
+        [50, 30, 15, 5],
+    )[0]
+    return await operation(context)
+
+
+async def register_login(context: Context) -> httpx.Response:
+    """
+    Регистрация нового пользователя с последующим входом
+    """
+    email = f"bench-{uuid.uuid4().hex}@example.com"
+    response = await context.client.post(
+        "/register", json={"email": email, "password": BENCH_PASSWORD}
+    )
+    if response.status_code != 201:
+        return response
+    return await context.client.post("/login", data={"username": email, "password": BENCH_PASSWORD})
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "feed": feed_read,
+    "post": post_read,
+    "vote-hot": hot_post_vote,
+    "mixed": mixed,
+    "auth": register_login,
+}
@@ -0,0 +1,125 @@
+import random
+import time
+
+from fastapi_users.password import PasswordHelper
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.enums.rating import VoteType
+from src.models.db import Post, User, Vote
+
+BENCH_PASSWORD = "benchmark"
+BENCH_EMAIL = "bench-{}@example.com"
+
+# Кол-во строк в одном INSERT при заполнении БД
+CHUNK_SIZE = 5000
+
+
+def zipf_weights(amount: int, skew: float) -> list[float]:
+    """
+    Веса популярности по закону Ципфа: элемент с рангом r выбирается с вероятностью ~ 1 / r^skew
+    :param amount: Кол-во элементов
+    :param skew: Показатель распределения, чем больше - тем сильнее перекос в сторону популярных
+    :return: Список весов по возрастанию ранга
+    """
+    return [1 / rank ** skew for rank in range(1, amount + 1)]
+
+
+async def _insert_chunks(session: AsyncSession, model, rows: list[dict]) -> None:
+    for start in range(0, len(rows), CHUNK_SIZE):
+        await session.execute(insert(model), rows[start:start + CHUNK_SIZE])
+
+
+async def seed(
+        session: AsyncSession,
+        users: int,
+        posts: int,
+        votes: int,
+        skew: float,
+        reset: bool,
+        random_seed: int,
+) -> dict[str, float]:
+    """
+    Заполнение БД тестовыми данными: пользователями, публикациями и оценками, популярность
+    публикаций распределена по закону Ципфа. Все пользователи получают один пароль BENCH_PASSWORD
+    :param session: Сессия БД
+    :param users: Кол-во пользователей
+    :param posts: Кол-во публикаций
+    :param votes: Кол-во оценок, ограничено кол-вом пар (пользователь, публикация)
+    :param skew: Показатель распределения Ципфа
+    :param reset: Очистить таблицы перед заполнением
+    :param random_seed: Зерно генератора случайных чисел для воспроизводимости
+    :return: Статистика заполнения
+    """
+    rng = random.Random(random_seed)
+    started = time.perf_counter()
+
+    if reset:
+        await session.execute(text('TRUNCATE votes, posts, "user" RESTART IDENTITY CASCADE'))
+
+    # Хэширование пароля дорогое, поэтому считаем его один раз для всех пользователей
+    hashed_password = PasswordHelper().hash(BENCH_PASSWORD)
+    offset = await session.scalar(text('SELECT coalesce(max(id), 0) FROM "user"'))
+    await _insert_chunks(session, User, [
+        {
+            "email": BENCH_EMAIL.format(offset + number),
+            "hashed_password": hashed_password,
+            "is_active": True,
+            "is_superuser": False,
+            "is_verified": True,
+        } for number in range(1, users + 1)
+    ])
+    result = await session.execute(
+        text('SELECT id FROM "user" WHERE email LIKE :pattern ORDER BY id'),
+        {"pattern": BENCH_EMAIL.format("%")},
+    )
+    user_ids = list(result.scalars())
+
+    await _insert_chunks(session, Post, [
+        {"body": f"Benchmark post #{number}", "author_id": rng.choice(user_ids)}
+        for number in range(posts)
+    ])
+    result = await session.execute(text("SELECT id FROM posts ORDER BY id"))
+    post_ids = list(result.scalars())
+
+    # Популярность публикаций не зависит от их возраста
+    ranked_post_ids = post_ids[:]
+    rng.shuffle(ranked_post_ids)
+    weights = zipf_weights(len(ranked_post_ids), skew)
+
+    votes = min(votes, len(user_ids) * len(post_ids))
+    pairs = set()
+    while len(pairs) < votes:
+        for post_id in rng.choices(ranked_post_ids, weights, k=votes - len(pairs)):
+            pairs.add((post_id, rng.choice(user_ids)))
+
+    vote_types = [VoteType.upvote.value] * 3 + [VoteType.downvote.value]
+    await _insert_chunks(session, Vote, [
+        {"post_id": post_id, "user_id": user_id, "type": rng.choice(vote_types)}
+        for post_id, user_id in pairs
+    ])
+
+    # Счётчики публикаций пересчитываются по вставленным оценкам
+    await session.execute(text("""
+        UPDATE posts
+        SET upvotes = counters.upvotes,
+            downvotes = counters.downvotes,
+            votes_amount = counters.votes_amount
+        FROM (
+            SELECT post_id,
+                   count(*) FILTER (WHERE type = 'upvote') AS upvotes,
+                   count(*) FILTER (WHERE type = 'downvote') AS downvotes,
+                   count(*) AS votes_amount
+            FROM votes
+            GROUP BY post_id
+        ) AS counters
+        WHERE posts.id = counters.post_id
+    """))
+    await session.execute(text("ANALYZE"))
+
+    return {
+        "users": len(user_ids),
+        "posts": len(post_ids),
+        "votes": len(pairs),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
@@ -0,0 +1,93 @@
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from src.models.dto.post import GetPost, posts_adapter
+
+
+def _rows(items: int) -> list[dict]:
+    created = datetime(2024, 1, 1)
+    return [
+        {
+            "id": number,
+            "body": f"Benchmark post #{number} " + "lorem ipsum " * 10,
+            "created": created + timedelta(seconds=number),
+            "author_id": number % 1000,
+            "votes_amount": number % 50,
+            "rating": number % 50 - 10,
+        } for number in range(items)
+    ]
+
+
+def _run_sync(coroutine):
+    # serialize_response для асинхронных обработчиков ничего не ожидает,
+    # поэтому цикл событий не нужен
+    try:
+        coroutine.send(None)
+    except StopIteration as result:
+        return result.value
+    raise RuntimeError("Coroutine has suspended")
+
+
+def _per_item_us(operation: Callable[[], object], items: int, repeat: int) -> float:
+    # Лучшее из повторов меньше всего зависит от фоновой нагрузки на машину
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        operation()
+        timings.append(time.perf_counter() - started)
+    return round(min(timings) / items * 1_000_000, 3)
+
+
+def run(items: int, repeat: int) -> dict:
+    """
+    Микро-бенчмарк сериализации страницы ленты: сравнение ответа через response_model
+    (повторная валидация и сериализация ответа FastAPI, JSONResponse)
+    с готовым JSON от pydantic-core.
+    Отдельно замеряется создание моделей с валидацией и без неё через model_construct
+    :param items: Кол-во публикаций на странице
+    :param repeat: Кол-во повторов каждого замера
+    :return: Время на одну публикацию в микросекундах
+    """
+    rows = _rows(items)
+    field = create_response_field(
+        name="Response_get_posts", type_=list[GetPost], mode="serialization"
+    )
+
+    def build_validated() -> list[GetPost]:
+        return [GetPost(**row) for row in rows]
+
+    def build_constructed() -> list[GetPost]:
+        return [GetPost.model_construct(**row) for row in rows]
+
+    posts = build_validated()
+
+    def respond_default() -> Response:
+        content = _run_sync(serialize_response(field=field, response_content=posts))
+        return JSONResponse(content)
+
+    def respond_fast() -> Response:
+        return Response(posts_adapter.dump_json(posts), media_type="application/json")
+
+    if json.loads(respond_default().body) != json.loads(respond_fast().body):
+        raise RuntimeError("Fast serialization path produces a different response")
+
+    return {
+        "items": items,
+        "repeat": repeat,
+        "per_item_us": {
+            "build": {
+                "validated": _per_item_us(build_validated, items, repeat),
+                "constructed": _per_item_us(build_constructed, items, repeat),
+            },
+            "respond": {
+                "default": _per_item_us(respond_default, items, repeat),
+                "fast": _per_item_us(respond_fast, items, repeat),
+            },
+        },
+    }
@@ -1,31 +1,74 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 import uvicorn
 
 from config.config import settings
 from src.handlers.posts import router as posts_router
+from src.handlers.metrics import router as metrics_router
+from src.handlers.votes import router as votes_router
+from src.services.db.base import dispose_engine, get_engine, get_replica_engines
+from src.services.metrics.collectors import register_collectors
+from src.services.limits.admission import AdmissionMiddleware, pool_timeout_handler
+from src.services.metrics.http import MetricsMiddleware
+from src.services.db.rating import leaderboard, vote_buffer
 from src.services.users.auth import user_auth, auth_backend
+from src.services.users.passwords import password_hasher
 from src.models.dto.user import GetUser, CreateUser
 
 
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    """
+    Запуск и остановка фоновых задач сервиса
+    """
+    # Движок создаётся уже в процессе воркера, после запуска сервера
+    get_engine()
+    if settings.VOTES.BUFFERED:
+        vote_buffer.start()
+    if settings.LEADERBOARD.ENABLED:
+        leaderboard.start()
+
+    yield
+
+    # Перед остановкой записываем в БД все накопленные оценки
+    await vote_buffer.stop()
+    await leaderboard.stop()
+    password_hasher.stop()
+    await dispose_engine()
+
+
 def build_app() -> FastAPI:
     """
     Конфигурация FastAPI приложения
     """
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
 
     app.include_router(posts_router)
+    app.include_router(votes_router)
     app.include_router(user_auth.get_auth_router(auth_backend))
     app.include_router(user_auth.get_register_router(GetUser, CreateUser))
 
+    # Middleware, добавленное последним, выполняется первым,
+    # поэтому отклонённые запросы попадают в метрики
+    if settings.ADMISSION.ENABLED:
+        app.add_middleware(AdmissionMiddleware)
+        app.add_exception_handler(PoolTimeoutError, pool_timeout_handler)
+    if settings.METRICS.ENABLED:
+        register_collectors(get_engine, get_replica_engines)
+        app.add_middleware(MetricsMiddleware)
+        app.include_router(metrics_router)
+
     return app
 
 
 if __name__ == "__main__":
-    server = uvicorn.Server(
-        uvicorn.Config(
-            app=build_app(),
-            host=settings.HOST,
-            port=settings.PORT,
-        )
+    # Приложение передаётся строкой фабрики, чтобы каждый воркер собирал его в своём процессе
+    uvicorn.run(
+        "main:build_app",
+        factory=True,
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=settings.WORKERS,
     )
-    server.run()
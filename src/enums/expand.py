@@ -0,0 +1,7 @@
+# pylint: disable=invalid-name
+
+from src.enums.base import ExtendedEnum
+
+
+class Expand(str, ExtendedEnum):
+    author = "author"
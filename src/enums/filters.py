@@ -6,3 +6,4 @@ from src.enums.base import ExtendedEnum
 class Filter(str, ExtendedEnum):
     latest = "latest"
     best = "best"
+    hot = "hot"
@@ -1,86 +1,316 @@
 # pylint: disable=missing-function-docstring
 
-from fastapi import APIRouter, HTTPException, Depends
+from datetime import datetime
+from typing import AsyncIterator, Optional, Union
 
-from src.enums.rating import VoteType
+from fastapi import APIRouter, Body, HTTPException, Depends, Header, Query, Response
+from fastapi.responses import StreamingResponse
+
+from config.config import settings
+from src.enums.expand import Expand
 from src.enums.filters import Filter
 from src.models.db import User
-from src.models.dto.post import CreatePost, GetPost
-from src.services.db.posts import posts_service
-from src.services.db.rating import rating_service
+from src.enums.rating import VoteType
+from src.models.dto.post import (
+    CreatePost, ExpandedPost, GetPost, PostsByIds, expanded_posts_adapter, posts_adapter
+)
+from src.models.dto.user import GetAuthor
+from src.services.db.authors import AuthorsService
+from src.services.db.posts import PostsService
+from src.services.db.rating import RatingService
+from src.services.limits.rate import vote_limiter
+from src.services.metrics.registry import REJECTED_REQUESTS
 from src.services.users.auth import get_current_user
-from src.utils.utils import get_post_view
+from src.utils.cursors import InvalidCursorError
+from src.utils.etags import etag_matches, page_etag, post_etag
+from src.utils.utils import to_naive_utc
 
 router = APIRouter()
 
 
-@router.get("/post/{post_id}")
-async def get_post(post_id: int) -> GetPost:
-    post = await posts_service.get(post_id)
+def _json_response(content: Union[bytes, str]) -> Response:
+    # Готовый JSON отдаётся как есть: FastAPI не валидирует и не сериализует ответ повторно,
+    # а схема ответа в OpenAPI задаётся через response_model
+    return Response(content, media_type="application/json")
+
+
+def _not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+async def _get_authors(
+        posts: list[GetPost], expand: list[Expand], authors_service: AuthorsService
+) -> Optional[dict[int, GetAuthor]]:
+    # Авторы всех публикаций ответа загружаются одним пакетом
+    if Expand.author not in expand:
+        return None
+    return await authors_service.get_many(post.author_id for post in posts)
+
+
+def _expand_posts(
+        posts: list[GetPost],
+        votes: Optional[dict[int, VoteType]] = None,
+        authors: Optional[dict[int, GetAuthor]] = None,
+) -> list[ExpandedPost]:
+    # Выставляются только запрошенные поля, остальные не попадают в ответ благодаря exclude_unset
+    expanded = []
+    for post in posts:
+        fields = dict(post)
+        if votes is not None:
+            fields["my_vote"] = votes.get(post.id)
+        if authors is not None:
+            fields["author"] = authors.get(post.author_id)
+        expanded.append(ExpandedPost(**fields))
+    return expanded
+
+
+@router.get("/post/{post_id}", response_model=ExpandedPost, response_model_exclude_unset=True)
+async def get_post(
+        post_id: int,
+        expand: list[Expand] = Query([]),
+        if_none_match: Optional[str] = Header(None),
+        posts_service: PostsService = Depends(PostsService.get_service(readonly=True)),
+        authors_service: AuthorsService = Depends(AuthorsService.get_service(readonly=True)),
+) -> Response:
+    post = await posts_service.get_view(post_id)
     if not post:
         raise HTTPException(404, detail="Post not found")
 
-    return await get_post_view(post)
+    authors = await _get_authors([post], expand, authors_service)
+    if authors is not None:
+        post = _expand_posts([post], authors=authors)[0]
 
+    etag = post_etag(post, post.author if authors is not None else None)
+    if etag_matches(if_none_match, etag):
+        return _not_modified_response(etag)
+
+    response = _json_response(post.model_dump_json(exclude_unset=True))
+    response.headers["ETag"] = etag
+    return response
 
-@router.post("/post")
-async def create_post(post_data: CreatePost, user: User = Depends(get_current_user())) -> int:
 
+@router.post("/post")
+async def create_post(
+        post_data: CreatePost,
+        user: User = Depends(get_current_user()),
+        posts_service: PostsService = Depends(PostsService.get_service()),
+) -> int:
     post = await posts_service.create(post_data.body, user)
     return post.id
 
 
-@router.post("/post/{post_id}/upvote")
-async def upvote_post(post_id: int, user: User = Depends(get_current_user())):
-    if not await posts_service.get(post_id):
-        raise HTTPException(404, detail="Post not found")
+@router.post("/posts/batch")
+async def create_posts(
+        posts_data: list[CreatePost] = Body(min_length=1, max_length=settings.POSTS.MAX_BATCH_SIZE),
+        user: User = Depends(get_current_user()),
+        posts_service: PostsService = Depends(PostsService.get_service()),
+) -> list[int]:
+    return await posts_service.create_many([post_data.body for post_data in posts_data], user)
+
+
+@router.get("/posts/by-ids", response_model=PostsByIds)
+async def get_posts_by_ids(
+        ids: list[int] = Query([], max_length=settings.POSTS.MAX_IDS),
+        expand: list[Expand] = Query([]),
+        posts_service: PostsService = Depends(PostsService.get_service(readonly=True)),
+        authors_service: AuthorsService = Depends(AuthorsService.get_service(readonly=True)),
+) -> Response:
+    post_ids = list(dict.fromkeys(ids))
+    posts = await posts_service.get_views(post_ids)
+    found = [posts[post_id] for post_id in post_ids if post_id in posts]
+
+    authors = await _get_authors(found, expand, authors_service)
+    result = PostsByIds(
+        posts=found if authors is None else _expand_posts(found, authors=authors),
+        missing=[post_id for post_id in post_ids if post_id not in posts],
+    )
+    return _json_response(result.model_dump_json(exclude_unset=True))
+
+
+@router.get(
+    "/users/{user_id}/posts",
+    response_model=list[ExpandedPost],
+    response_model_exclude_unset=True,
+)
+async def get_user_posts(
+        user_id: int,
+        amount: int = Query(10, ge=1, le=settings.POSTS.MAX_AMOUNT),
+        cursor: Optional[str] = None,
+        expand: list[Expand] = Query([]),
+        if_none_match: Optional[str] = Header(None),
+        posts_service: PostsService = Depends(PostsService.get_service(readonly=True)),
+        authors_service: AuthorsService = Depends(AuthorsService.get_service(readonly=True)),
+) -> Response:
+    try:
+        page = await posts_service.get_author_posts(user_id, amount, cursor)
+    except InvalidCursorError as error:
+        raise HTTPException(400, detail=str(error)) from error
+
+    # Существование пользователя проверяется, только если у него не нашлось публикаций
+    if not page.posts and cursor is None and not await authors_service.get_many([user_id]):
+        raise HTTPException(404, detail="User not found")
 
-    if not await rating_service.is_post_voted_by_user(post_id, user.id):
-        await posts_service.upvote(post_id, user.id)
-        return {"success": True}
+    authors = await _get_authors(page.posts, expand, authors_service)
+    etag = page_etag(page, authors=authors)
+    if etag_matches(if_none_match, etag):
+        response = _not_modified_response(etag)
+    elif authors is not None:
+        posts = _expand_posts(page.posts, authors=authors)
+        response = _json_response(expanded_posts_adapter.dump_json(posts, exclude_unset=True))
+        response.headers["ETag"] = etag
+    else:
+        response = _json_response(posts_adapter.dump_json(page.posts))
+        response.headers["ETag"] = etag
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return response
 
-    user_vote = await rating_service.get_user_post_vote(post_id, user.id)
-    if user_vote.type == VoteType.upvote:
+
+@router.get("/posts/search", response_model=list[ExpandedPost], response_model_exclude_unset=True)
+async def search_posts(
+        q: str = Query(min_length=1, max_length=settings.POSTS.SEARCH_MAX_QUERY_LENGTH),
+        amount: int = Query(10, ge=1, le=settings.POSTS.MAX_AMOUNT),
+        cursor: Optional[str] = None,
+        blend_rating: bool = False,
+        expand: list[Expand] = Query([]),
+        posts_service: PostsService = Depends(PostsService.get_service(readonly=True)),
+        authors_service: AuthorsService = Depends(AuthorsService.get_service(readonly=True)),
+) -> Response:
+    try:
+        page = await posts_service.search(q, amount, cursor, blend_rating)
+    except InvalidCursorError as error:
+        raise HTTPException(400, detail=str(error)) from error
+
+    authors = await _get_authors(page.posts, expand, authors_service)
+    if authors is None:
+        response = _json_response(posts_adapter.dump_json(page.posts))
+    else:
+        posts = _expand_posts(page.posts, authors=authors)
+        response = _json_response(expanded_posts_adapter.dump_json(posts, exclude_unset=True))
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return response
+
+
+async def _to_ndjson(chunks: AsyncIterator[list[GetPost]]) -> AsyncIterator[str]:
+    async for posts in chunks:
+        yield "".join(post.model_dump_json() + "\n" for post in posts)
+
+
+@router.get("/posts/export", response_class=StreamingResponse)
+async def export_posts(
+        since_id: Optional[int] = None,
+        since_created: Optional[datetime] = None,
+) -> StreamingResponse:
+    # Колонка created хранит время без часового пояса, а ошибка БД внутри потока
+    # оборвала бы уже начатый ответ, поэтому параметр приводится к UTC заранее
+    if since_created is not None:
+        since_created = to_naive_utc(since_created)
+
+    return StreamingResponse(
+        _to_ndjson(PostsService.export(since_id, since_created)),
+        media_type="application/x-ndjson",
+    )
+
+
+def _limit_votes(user_id: int) -> None:
+    if vote_limiter is None:
+        return
+
+    wait = vote_limiter.acquire(user_id)
+    if wait:
+        REJECTED_REQUESTS.labels("vote").inc()
+        raise HTTPException(
+            429, detail="Too many votes", headers={"Retry-After": vote_limiter.retry_after(wait)}
+        )
+
+
+@router.post("/post/{post_id}/upvote")
+async def upvote_post(
+        post_id: int,
+        user: User = Depends(get_current_user()),
+        posts_service: PostsService = Depends(PostsService.get_service()),
+):
+    _limit_votes(user.id)
+    if not await posts_service.upvote(post_id, user.id):
+        if not await posts_service.get(post_id):
+            raise HTTPException(404, detail="Post not found")
         raise HTTPException(400, detail="You already upvoted this post")
 
-    await rating_service.cancel_user_vote(post_id, user.id)
-    await posts_service.upvote(post_id, user.id)
     return {"success": True}
 
 
 @router.post("/post/{post_id}/downvote")
-async def downvote_post(post_id: int, user: User = Depends(get_current_user())):
-    if not await posts_service.get(post_id):
-        raise HTTPException(404, detail="Post not found")
-
-    if not await rating_service.is_post_voted_by_user(post_id, user.id):
-        await posts_service.downvote(post_id, user.id)
-        return {"success": True}
-
-    user_vote = await rating_service.get_user_post_vote(post_id, user.id)
-    if user_vote.type == VoteType.downvote:
+async def downvote_post(
+        post_id: int,
+        user: User = Depends(get_current_user()),
+        posts_service: PostsService = Depends(PostsService.get_service()),
+):
+    _limit_votes(user.id)
+    if not await posts_service.downvote(post_id, user.id):
+        if not await posts_service.get(post_id):
+            raise HTTPException(404, detail="Post not found")
         raise HTTPException(400, detail="You already downvoted this post")
 
-    await rating_service.cancel_user_vote(post_id, user.id)
-    await posts_service.downvote(post_id, user.id)
     return {"success": True}
 
 
 @router.post("/post/{post_id}/cancel-vote")
-async def cancel_vote(post_id: int, user: User = Depends(get_current_user())):
-    if not await posts_service.get(post_id):
-        raise HTTPException(404, detail="Post not found")
-
-    if not await rating_service.is_post_voted_by_user(post_id, user.id):
+async def cancel_vote(
+        post_id: int,
+        user: User = Depends(get_current_user()),
+        posts_service: PostsService = Depends(PostsService.get_service()),
+        rating_service: RatingService = Depends(RatingService.get_service()),
+):
+    _limit_votes(user.id)
+    if not await rating_service.cancel_user_vote(post_id, user.id):
+        if not await posts_service.get(post_id):
+            raise HTTPException(404, detail="Post not found")
         raise HTTPException(400, detail="You didn't vote for this post")
 
-    await rating_service.cancel_user_vote(post_id, user.id)
     return {"success": True}
 
 
-@router.get("/posts")
-async def get_posts(sorting: Filter, amount: int = 10) -> list[GetPost]:
-    if sorting == Filter.latest:
-        return await posts_service.get_latest_posts(amount)
-    if sorting == Filter.best:
-        return await posts_service.get_best_posts(amount)
+@router.get("/posts", response_model=list[ExpandedPost], response_model_exclude_unset=True)
+async def get_posts(
+        sorting: Filter,
+        amount: int = Query(10, ge=1, le=settings.POSTS.MAX_AMOUNT),
+        cursor: Optional[str] = None,
+        include_my_vote: bool = False,
+        expand: list[Expand] = Query([]),
+        if_none_match: Optional[str] = Header(None),
+        user: Optional[User] = Depends(get_current_user(optional=True)),
+        posts_service: PostsService = Depends(PostsService.get_service(readonly=True)),
+        rating_service: RatingService = Depends(RatingService.get_service()),
+        authors_service: AuthorsService = Depends(AuthorsService.get_service(readonly=True)),
+) -> Response:
+    if include_my_vote and user is None:
+        raise HTTPException(401, detail="Unauthorized")
+
+    try:
+        page = await posts_service.get_feed(sorting, amount, cursor)
+    except InvalidCursorError as error:
+        raise HTTPException(400, detail=str(error)) from error
+
+    # Оценки читаются из основной БД, чтобы пользователь сразу видел
+    # свою только что поставленную оценку
+    votes = None
+    if include_my_vote:
+        votes = await rating_service.get_user_votes(user.id, [post.id for post in page.posts])
+    authors = await _get_authors(page.posts, expand, authors_service)
+
+    etag = page_etag(page, votes, authors)
+    if etag_matches(if_none_match, etag):
+        response = _not_modified_response(etag)
+    elif votes is not None or authors is not None:
+        posts = _expand_posts(page.posts, votes, authors)
+        response = _json_response(expanded_posts_adapter.dump_json(posts, exclude_unset=True))
+        response.headers["ETag"] = etag
+    else:
+        response = _json_response(posts_adapter.dump_json(page.posts))
+        response.headers["ETag"] = etag
+    if votes is not None:
+        response.headers["Vary"] = "Authorization"
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return response
@@ -0,0 +1,21 @@
+# pylint: disable=missing-function-docstring
+
+from fastapi import APIRouter, Depends, Query
+
+from config.config import settings
+from src.models.db import User
+from src.models.dto.vote import GetVote
+from src.services.db.rating import RatingService
+from src.services.users.auth import get_current_user
+
+router = APIRouter()
+
+
+@router.get("/me/votes")
+async def get_my_votes(
+        post_ids: list[int] = Query([], max_length=settings.POSTS.MAX_IDS),
+        user: User = Depends(get_current_user()),
+        rating_service: RatingService = Depends(RatingService.get_service()),
+) -> list[GetVote]:
+    votes = await rating_service.get_user_votes(user.id, list(dict.fromkeys(post_ids)))
+    return [GetVote(post_id=post_id, type=vote_type) for post_id, vote_type in votes.items()]
@@ -1,11 +1,16 @@
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, Computed, Float, Integer, String, TIMESTAMP, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from src.models.db.base import Base
 
+# Конфигурация полнотекстового поиска.
+# Русская конфигурация обрабатывает и латиницу английским стеммером
+SEARCH_CONFIG = "russian"
+
 
 class Post(Base):
     __tablename__ = "posts"
@@ -17,3 +22,35 @@ class Post(Base):
     author = relationship("User", back_populates="posts")
 
     created: datetime = Column(TIMESTAMP, server_default=func.now())
+
+    # Счётчики оценок денормализованы и обновляются в одной транзакции с изменением оценок
+    upvotes: int = Column(Integer, nullable=False, default=0, server_default="0")
+    downvotes: int = Column(Integer, nullable=False, default=0, server_default="0")
+    votes_amount: int = Column(Integer, nullable=False, default=0, server_default="0")
+    rating: int = Column(Integer, Computed("upvotes - downvotes", persisted=True))
+    # Оценка для ленты hot по формуле Reddit: порядок рейтинга плюс время создания, где 45000 секунд
+    # новизны весят как десятикратный рейтинг. Оценка не зависит от текущего времени, поэтому старые
+    # публикации опускаются без пересчёта, а сама оценка меняется только вместе со счётчиками оценок
+    hot: float = Column(Float, Computed(
+        "sign(upvotes - downvotes) * log(greatest(abs(upvotes - downvotes), 1))"
+        " + (extract(epoch FROM created) - 1134028003) / 45000",
+        persisted=True,
+    ))
+    # Поисковый вектор текста публикации. Нужен только в условиях поиска, поэтому колонка
+    # не отображается на атрибут модели: она не загружается вместе с публикацией
+    # и не возвращается при её создании
+    search = Column(TSVECTOR, Computed(
+        f"to_tsvector('{SEARCH_CONFIG}', coalesce(body, ''))",
+        persisted=True,
+    ))
+
+    __mapper_args__ = {"eager_defaults": True, "exclude_properties": ["search"]}
+    __table_args__ = (
+        # Индексы под keyset-пагинацию лент latest, best и hot
+        Index("ix_posts_created_id", "created", "id"),
+        Index("ix_posts_rating_id", "rating", "id"),
+        Index("ix_posts_hot_id", "hot", "id"),
+        # Публикации автора по убыванию даты создания: обратный проход индекса внутри одного автора
+        Index("ix_posts_author_id_created_id", "author_id", "created", "id"),
+        Index("ix_posts_search", "search", postgresql_using="gin"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Enum
+from sqlalchemy import Column, Integer, ForeignKey, Enum, Index
 
 from src.models.db.base import Base
 from src.enums.rating import VoteType
@@ -11,3 +11,10 @@ class Vote(Base):
     user_id: int = Column(ForeignKey("user.id"))
     post_id: int = Column(ForeignKey("posts.id"))
     type: str = Column(Enum(*VoteType.values(), name="vote_type"))
+
+    __table_args__ = (
+        # Пользователь может оценить публикацию только один раз
+        Index("ux_votes_post_id_user_id", "post_id", "user_id", unique=True),
+        # Покрывающий индекс под получение оценок пользователя без чтения таблицы
+        Index("ix_votes_user_id_post_id", "user_id", "post_id", postgresql_include=["type"]),
+    )
@@ -1,5 +1,5 @@
 from fastapi_users.db import SQLAlchemyBaseUserTable
-from sqlalchemy import Column, Integer
+from sqlalchemy import Column, Integer, String
 from sqlalchemy.orm import relationship
 
 from src.models.db.base import Base
@@ -7,4 +7,6 @@ from src.models.db.base import Base
 
 class User(SQLAlchemyBaseUserTable, Base):
     id: int = Column(Integer, primary_key=True)
+    # Публичное имя, которое видят другие пользователи. Почта пользователя наружу не выдаётся
+    display_name: str = Column(String(64), nullable=True)
     posts = relationship("Post", back_populates="author")
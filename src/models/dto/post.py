@@ -1,9 +1,14 @@
 from datetime import datetime
+from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, SerializeAsAny, TypeAdapter
+
+from src.enums.rating import VoteType
+from src.models.dto.user import GetAuthor
 
 
 class GetPost(BaseModel):
+    id: int
     body: str
     created: datetime
     author_id: int
@@ -11,5 +16,27 @@ class GetPost(BaseModel):
     rating: int
 
 
+class ExpandedPost(GetPost):
+    # Дополнительные поля выводятся, только если их запросили, поэтому сериализуется с exclude_unset
+    my_vote: Optional[VoteType] = None
+    author: Optional[GetAuthor] = None
+
+
+# Сериализация списков публикаций напрямую в JSON-байты средствами pydantic-core
+posts_adapter = TypeAdapter(list[GetPost])
+expanded_posts_adapter = TypeAdapter(list[ExpandedPost])
+
+
 class CreatePost(BaseModel):
     body: str
+
+
+class PostsPage(BaseModel):
+    posts: list[GetPost]
+    next_cursor: Optional[str] = None
+
+
+class PostsByIds(BaseModel):
+    # Публикации сериализуются по фактическому типу, чтобы выводились поля ExpandedPost
+    posts: list[SerializeAsAny[GetPost]]
+    missing: list[int]
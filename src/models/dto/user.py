@@ -1,13 +1,18 @@
+from typing import Optional
+
 from fastapi_users import schemas
+from pydantic import BaseModel, Field
 
 
 class GetUser(schemas.BaseUser[int]):
-    pass
+    display_name: Optional[str] = None
 
 
 class CreateUser(schemas.BaseUserCreate):
-    pass
+    display_name: Optional[str] = Field(None, max_length=64)
 
 
-class UpdateUser(schemas.BaseUserUpdate):
-    pass
+class GetAuthor(BaseModel):
+    # Публичные данные автора публикации, без персональных данных пользователя
+    id: int
+    display_name: Optional[str] = None
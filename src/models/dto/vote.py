@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+from src.enums.rating import VoteType
+
+
+class GetVote(BaseModel):
+    post_id: int
+    type: VoteType
@@ -0,0 +1,158 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional, Union
+
+# Значение по умолчанию, отличающее промах от закэшированного None
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Ограниченный по размеру LRU-кэш в памяти процесса с временем жизни записей.
+    Конкурентные промахи по одному ключу объединяются: данные загружает только первый
+    запрос, остальные дожидаются его результата. Если задан negative_ttl, значения None
+    (например, отсутствующие в БД записи) кэшируются на это время
+    """
+
+    def __init__(self, max_size: int, ttl: float, negative_ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        # Незавершённые загрузки. Инвалидация убирает загрузку отсюда,
+        # и её результат не попадёт в кэш
+        self._loading: dict[Hashable, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Получение значения из кэша
+        :param key: Ключ записи
+        :param default: Значение, возвращаемое при промахе
+        :return: Закэшированное значение либо default
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Получение значения из кэша без учёта в статистике и без продления записи в LRU-очереди.
+        Используется для служебных проверок, которые не являются обращениями к данным кэша
+        :param key: Ключ записи
+        :param default: Значение, возвращаемое при промахе
+        :return: Закэшированное значение либо default
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return default
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Запись значения в кэш с вытеснением самых давно использованных записей
+        :param key: Ключ записи
+        :param value: Значение
+        :param ttl: Время жизни записи в секундах. По умолчанию используется TTL кэша
+        """
+        if ttl is None:
+            ttl = self.negative_ttl if value is None and self.negative_ttl is not None else self.ttl
+        expires = time.monotonic() + ttl
+        self._entries[key] = (expires, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """
+        Удаление записи из кэша
+        :param key: Ключ записи
+        """
+        self._entries.pop(key, None)
+        self._loading.pop(key, None)
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> None:
+        """
+        Инвалидация записей кэша
+        :param predicate: Функция, отбирающая ключи для удаления. По умолчанию удаляются все записи
+        """
+        if predicate is None:
+            self._entries.clear()
+            self._loading.clear()
+            return
+
+        for key in [key for key in self._entries if predicate(key)]:
+            del self._entries[key]
+        for key in [key for key in self._loading if predicate(key)]:
+            del self._loading[key]
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Получение значения из кэша, а при промахе - загрузка с последующим кэшированием
+        :param key: Ключ записи
+        :param loader: Корутина-фабрика, загружающая значение
+        :return: Значение из кэша либо загруженное значение
+        """
+        value = self.get(key, MISSING)
+        if value is not MISSING:
+            return value
+
+        future = self._loading.get(key)
+        if future is not None:
+            self.coalesced += 1
+            await asyncio.wait([future])
+            # Если загружавший запрос был отменён, загружаем данные сами
+            if not future.cancelled():
+                return future.result()
+
+        return await self._load(key, loader)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        current = False
+
+        try:
+            value = await loader()
+        except Exception as error:
+            future.set_exception(error)
+            # Помечаем исключение полученным, даже если результата никто не ждал
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            current = self._loading.get(key) is future
+            if current:
+                del self._loading[key]
+
+        if current and (value is not None or self.negative_ttl is not None):
+            self.set(key, value)
+        future.set_result(value)
+        return value
+
+    def stats(self) -> dict[str, Union[int, float]]:
+        """
+        Статистика использования кэша
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+        }
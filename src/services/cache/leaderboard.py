@@ -0,0 +1,116 @@
+import asyncio
+import logging
+from bisect import bisect_left, insort
+from typing import Awaitable, Callable, Optional
+
+from src.utils.background import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+# Ключ сортировки публикации - (рейтинг, ID)
+RatingKey = tuple[int, int]
+
+
+class Leaderboard(BackgroundTask):
+    """
+    Отсортированный по (рейтинг, ID) список лучших публикаций в памяти процесса.
+    Хранятся только size + margin лучших публикаций: все публикации с ключом не ниже
+    нижней границы гарантированно есть в списке, поэтому страницы выше границы можно отдавать
+    без обращения к БД. Изменения рейтинга применяются за O(log n) поиска, а раз в interval
+    секунд список полностью сверяется с БД, чтобы исправить расхождения, например от оценок
+    в других процессах
+    """
+
+    def __init__(
+            self,
+            load: Callable[[int], Awaitable[list[RatingKey]]],
+            size: int,
+            margin: int,
+            interval: float,
+    ):
+        super().__init__()
+        self.capacity = size + margin
+        self.interval = interval
+
+        self._load = load
+        self._keys: list[RatingKey] = []
+        self._ratings: dict[int, int] = {}
+        # Нижняя граница списка, None - в списке все публикации
+        self._floor: Optional[RatingKey] = None
+        self._ready = False
+        # Изменения рейтинга, пришедшие во время загрузки списка из БД
+        self._pending: Optional[dict[int, int]] = None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def update(self, post_id: int, rating: int) -> None:
+        """
+        Применение нового рейтинга публикации
+        :param post_id: ID публикации
+        :param rating: Актуальный рейтинг публикации
+        """
+        if self._pending is not None:
+            self._pending[post_id] = rating
+        if not self._ready:
+            return
+
+        old_rating = self._ratings.pop(post_id, None)
+        if old_rating is not None:
+            del self._keys[bisect_left(self._keys, (old_rating, post_id))]
+
+        key = (rating, post_id)
+        if self._floor is not None and key < self._floor:
+            return
+
+        insort(self._keys, key)
+        self._ratings[post_id] = rating
+        if len(self._keys) > self.capacity:
+            _, dropped_id = self._keys.pop(0)
+            del self._ratings[dropped_id]
+            self._floor = self._keys[0]
+
+    def page(self, amount: int, after: Optional[RatingKey] = None) -> Optional[list[RatingKey]]:
+        """
+        Получение страницы ленты best по убыванию ключа
+        :param amount: Кол-во публикаций на странице. Возвращается на одну больше,
+        чтобы определить наличие следующей
+        :param after: Ключ последней публикации предыдущей страницы
+        :return: Ключи публикаций либо None, если страница выходит за нижнюю границу списка
+        """
+        if not self._ready:
+            return None
+
+        end = len(self._keys) if after is None else bisect_left(self._keys, after)
+        start = max(end - amount - 1, 0)
+        if end - start <= amount and self._floor is not None:
+            return None
+
+        return self._keys[start:end][::-1]
+
+    async def resync(self) -> None:
+        """
+        Загрузка списка лучших публикаций из БД. Изменения, пришедшие во время загрузки,
+        применяются поверх загруженного списка
+        """
+        self._pending = {}
+        try:
+            keys = await self._load(self.capacity)
+        finally:
+            pending, self._pending = self._pending, None
+
+        self._keys = sorted(keys)
+        self._ratings = {post_id: rating for rating, post_id in self._keys}
+        self._floor = self._keys[0] if len(self._keys) >= self.capacity else None
+        self._ready = True
+
+        for post_id, rating in pending.items():
+            self.update(post_id, rating)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.resync()
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Failed to load the best posts leaderboard")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,30 @@
+from typing import Hashable
+
+from config.config import settings
+from src.enums.filters import Filter
+from src.services.cache.base import TTLCache
+
+# Страницы лент, ключ - (сортировка, кол-во публикаций, курсор)
+feed_cache = TTLCache(max_size=settings.CACHE.FEED_MAX_SIZE, ttl=settings.CACHE.FEED_TTL)
+
+# Неизменяемые данные публикаций по ID. Отсутствующие публикации кэшируются на короткое время
+post_cache = TTLCache(
+    max_size=settings.CACHE.POST_MAX_SIZE,
+    ttl=settings.CACHE.POST_TTL,
+    negative_ttl=settings.CACHE.POST_NEGATIVE_TTL,
+)
+
+# Рейтинг и кол-во голосов публикаций по ID, обновляются при оценках
+post_counters_cache = TTLCache(
+    max_size=settings.CACHE.POST_MAX_SIZE,
+    ttl=settings.CACHE.POST_COUNTERS_TTL,
+)
+
+
+def is_rating_ordered_feed(key: Hashable) -> bool:
+    """
+    Отбор страниц лент, порядок публикаций в которых зависит от оценок.
+    Счётчики публикаций в остальных лентах обновляются из post_counters_cache при выдаче
+    :param key: Ключ feed_cache
+    """
+    return key[0] in (Filter.best, Filter.hot)
@@ -0,0 +1,12 @@
+from src.services.cache.base import TTLCache
+from src.services.cache.posts import feed_cache, post_cache, post_counters_cache
+from src.services.cache.users import author_cache, user_cache
+
+# Все кэши сервиса по названию, используются для вывода статистики
+CACHES: dict[str, TTLCache] = {
+    "feed": feed_cache,
+    "post": post_cache,
+    "post_counters": post_counters_cache,
+    "user": user_cache,
+    "author": author_cache,
+}
@@ -0,0 +1,8 @@
+from config.config import settings
+from src.services.cache.base import TTLCache
+
+# Активные пользователи по ID, используются при аутентификации запросов
+user_cache = TTLCache(max_size=settings.AUTH.USER_CACHE_MAX_SIZE, ttl=settings.AUTH.USER_CACHE_TTL)
+
+# Публичные данные авторов публикаций по ID
+author_cache = TTLCache(max_size=settings.CACHE.AUTHOR_MAX_SIZE, ttl=settings.CACHE.AUTHOR_TTL)
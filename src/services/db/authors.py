@@ -0,0 +1,50 @@
+from typing import Iterable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from src.models.db import User
+from src.models.dto.user import GetAuthor
+from src.services.cache.base import MISSING
+from src.services.cache.users import author_cache
+from src.services.db.base import BaseDBService
+
+
+class AuthorsService(BaseDBService):
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(session)
+        # Авторы, уже полученные в рамках текущего запроса
+        self._loaded: dict[int, GetAuthor] = {}
+
+    async def get_many(self, author_ids: Iterable[int]) -> dict[int, GetAuthor]:
+        """
+        Получение публичных данных авторов. Все ID собираются в один пакет, авторы,
+        которых нет в кэше и которые ещё не загружались в этом запросе, загружаются одним запросом
+        :param author_ids: ID авторов, могут повторяться
+        :return: DTO-Модели GetAuthor найденных авторов по их ID
+        """
+        author_ids = list(dict.fromkeys(author_ids))
+        to_load = []
+        for author_id in author_ids:
+            if author_id in self._loaded:
+                continue
+
+            author = author_cache.get(author_id, MISSING)
+            if author is MISSING:
+                to_load.append(author_id)
+            elif author is not None:
+                self._loaded[author_id] = author
+
+        if to_load:
+            statement = select(User.id, User.display_name).where(User.id.in_(to_load))
+            result = await self.session.execute(statement)
+            for row in result:
+                author = GetAuthor(id=row.id, display_name=row.display_name)
+                author_cache.set(author.id, author)
+                self._loaded[author.id] = author
+
+        return {
+            author_id: self._loaded[author_id]
+            for author_id in author_ids if author_id in self._loaded
+        }
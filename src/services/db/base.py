@@ -1,28 +1,214 @@
-from typing import AsyncGenerator
+import asyncio
+import logging
+import time
+from itertools import count
+from typing import AsyncGenerator, Callable, Optional
 
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from fastapi import Depends
+from sqlalchemy import make_url
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import (
+    create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
+)
 
 from config.config import settings
+from src.services.metrics.sql import instrument_engine
 
-engine = create_async_engine(
-    url=settings.POSTGRES.build_url(),
-)
+logger = logging.getLogger(__name__)
+
+_engine: Optional[AsyncEngine] = None
+_replica_engines: Optional[list[AsyncEngine]] = None
+# Время (по time.monotonic), до которого реплика с данным индексом считается недоступной
+_replica_down_until: dict[int, float] = {}
+_replica_counter = count()
+
+
+class ReadOnlySession(AsyncSession):  # pylint: disable=abstract-method
+    """
+    Сессия для запросов только на чтение. Реплика выбирается и проверяется при первом запросе,
+    поэтому запрос, ответ на который целиком взят из кэшей, не занимает соединение с БД
+    """
+
+    _read_bind_chosen = False
+
+    async def execute(self, statement, *args, **kwargs):
+        await self._choose_read_bind()
+        return await super().execute(statement, *args, **kwargs)
+
+    async def stream(self, statement, *args, **kwargs):
+        await self._choose_read_bind()
+        return await super().stream(statement, *args, **kwargs)
+
+    async def _choose_read_bind(self) -> None:
+        """
+        Привязка сессии к реплике. Реплики перебираются по кругу, начиная со следующей
+        после использованной прошлым запросом. Реплика, к которой не удалось подключиться
+        или в пуле которой не нашлось свободного соединения, пропускается в течение
+        REPLICA_RETRY_INTERVAL секунд. Если доступных реплик нет, сессия остаётся на основной БД
+        """
+        if self._read_bind_chosen:
+            return
+        self._read_bind_chosen = True
+
+        replicas = get_replica_engines()
+        start = next(_replica_counter)
+        for offset in range(len(replicas)):
+            index = (start + offset) % len(replicas)
+            if _replica_down_until.get(index, 0) > time.monotonic():
+                continue
+
+            self._set_bind(replicas[index])
+            try:
+                await self.connection()
+            except (OSError, asyncio.TimeoutError, DBAPIError, PoolTimeoutError) as error:
+                await self.close()
+                _replica_down_until[index] = (
+                    time.monotonic() + settings.POSTGRES.REPLICA_RETRY_INTERVAL
+                )
+                logger.warning("Replica #%d is unavailable: %r", index, error)
+                continue
+
+            return
+
+        self._set_bind(get_engine())
+
+    def _set_bind(self, engine: AsyncEngine) -> None:
+        self.bind = engine
+        self.sync_session.bind = engine.sync_engine
+
+
+# Фабрики сессий привязываются к движку при его создании в get_engine
 session_factory = async_sessionmaker(
-    engine,
     class_=AsyncSession,
     expire_on_commit=False,
 )
+readonly_session_factory = async_sessionmaker(
+    class_=ReadOnlySession,
+    expire_on_commit=False,
+)
+
+
+def _create_engine(url: str, pool_timeout: float, **kwargs) -> AsyncEngine:
+    postgres = settings.POSTGRES
+    engine = create_async_engine(
+        url=make_url(url).update_query_dict({
+            "prepared_statement_cache_size": str(postgres.PREPARED_STATEMENT_CACHE_SIZE),
+        }),
+        pool_size=postgres.POOL_SIZE,
+        max_overflow=postgres.MAX_OVERFLOW,
+        pool_timeout=pool_timeout,
+        pool_recycle=postgres.POOL_RECYCLE,
+        pool_pre_ping=postgres.POOL_PRE_PING,
+        **kwargs,
+    )
+    instrument_engine(engine)
+    return engine
+
+
+def get_engine() -> AsyncEngine:
+    """
+    Движок основной БД текущего процесса. Создаётся при первом обращении, а не при импорте модуля,
+    чтобы при запуске нескольких воркеров каждый процесс открывал собственный пул соединений
+    :return: Асинхронный движок БД
+    """
+    global _engine  # pylint: disable=global-statement
+    if _engine is None:
+        pool_timeout = settings.POSTGRES.POOL_TIMEOUT
+        if settings.ADMISSION.ENABLED:
+            # Запрос, прошедший ограничение нагрузки, ждёт соединения не дольше, чем ждал бы места,
+            # иначе при нехватке соединений запросы снова копятся в очереди к пулу
+            pool_timeout = min(pool_timeout, settings.ADMISSION.QUEUE_TIMEOUT)
+        _engine = _create_engine(settings.POSTGRES.build_url(), pool_timeout)
+        session_factory.configure(bind=_engine)
+        readonly_session_factory.configure(bind=_engine)
+
+    return _engine
+
+
+def get_replica_engines() -> list[AsyncEngine]:
+    """
+    Движки реплик для чтения текущего процесса, создаются при первом обращении
+    :return: Асинхронные движки реплик в порядке settings.POSTGRES.REPLICAS
+    """
+    global _replica_engines  # pylint: disable=global-statement
+    if _replica_engines is None:
+        # Занятая реплика не должна задерживать запрос дольше недоступной,
+        # поэтому ожидание соединения из её пула ограничено тем же временем, что и подключение
+        timeout = min(settings.POSTGRES.POOL_TIMEOUT, settings.POSTGRES.REPLICA_CONNECT_TIMEOUT)
+        _replica_engines = [
+            _create_engine(url, timeout, connect_args={"timeout": timeout})
+            for url in settings.POSTGRES.REPLICAS
+        ]
+
+    return _replica_engines
+
+
+async def dispose_engine() -> None:
+    """
+    Закрытие всех соединений пулов движков БД текущего процесса
+    """
+    global _engine, _replica_engines  # pylint: disable=global-statement
+    for engine in [_engine, *(_replica_engines or [])]:
+        if engine is not None:
+            await engine.dispose()
+
+    _engine = None
+    _replica_engines = None
+    _replica_down_until.clear()
 
 
 class BaseDBService:
-    def __init__(self):
-        self.session: AsyncSession = session_factory()
+    def __init__(self, session: AsyncSession):
+        self.session: AsyncSession = session
 
     @staticmethod
     async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
         """
-        Фактори асинхронной сессии базы данных
-        :return:
+        Фактори асинхронной сессии базы данных. Используется в качестве зависимости FastAPI,
+        поэтому в рамках одного запроса все сервисы работают в одной сессии.
+        Транзакция фиксируется один раз в конце запроса либо откатывается при ошибке
+        :return: Сессия базы данных, привязанная к запросу
         """
         async with session_factory() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+            for callback in session.info.pop("after_commit", []):
+                callback()
+
+    @staticmethod
+    async def get_async_readonly_session() -> AsyncGenerator[AsyncSession, None]:
+        """
+        Фактори асинхронной сессии базы данных для запросов только на чтение.
+        Если настроены реплики, при первом запросе сессия привязывается к одной из них,
+        иначе работает с основной БД. Данные реплики могут отставать, поэтому чтение
+        сразу после записи должно идти через get_async_session
+        :return: Сессия базы данных, привязанная к запросу
+        """
+        async with readonly_session_factory() as session:
             yield session
+
+    def on_commit(self, callback: Callable[[], None]) -> None:
+        """
+        Регистрация действия, которое нужно выполнить после фиксации транзакции запроса,
+        например инвалидации кэшей после записи
+        :param callback: Функция без аргументов
+        """
+        self.session.info.setdefault("after_commit", []).append(callback)
+
+    @classmethod
+    def get_service(cls, readonly: bool = False) -> Callable:
+        """
+        Фактори зависимости FastAPI, создающей сервис поверх сессии текущего запроса
+        :param readonly: Сервис только читает данные и может работать с репликой
+        """
+        get_session = cls.get_async_readonly_session if readonly else cls.get_async_session
+
+        async def dependency(session: AsyncSession = Depends(get_session)):
+            return cls(session)
+
+        return dependency
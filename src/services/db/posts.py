@@ -1,25 +1,105 @@
-from sqlalchemy import desc
-from sqlalchemy.sql import func, ColumnElement
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Optional, Sequence
+
+from sqlalchemy import ColumnElement, Float, cast, desc, func, insert, tuple_
 from sqlalchemy.future import select
+from sqlalchemy.orm import InstrumentedAttribute
 
+from config.config import settings
+from src.services.cache.base import MISSING
+from src.services.cache.posts import feed_cache, post_cache, post_counters_cache
 from src.services.db.base import BaseDBService
-from src.services.db.rating import rating_service
-from src.models.db import Post, User, Vote
-from src.models.dto.post import GetPost
+from src.services.db.rating import RatingService, leaderboard
+from src.models.db import Post, User
+from src.models.db.post import SEARCH_CONFIG
+from src.models.dto.post import GetPost, PostsPage
+from src.enums.filters import Filter
 from src.enums.rating import VoteType
+from src.utils.cursors import decode_cursor, encode_cursor
+from src.utils.utils import get_post_view
 
 
 class PostsService(BaseDBService):
-    async def get(self, post_id: int) -> Post:
+    async def get(self, post_id: int) -> Optional[Post]:
         """
         Получение БД объекта публикации по её ID
         :param post_id: ID публикации в БД
-        :return: Объект Post, содержащий информацию о публикации
+        :return: Объект Post, содержащий информацию о публикации, либо None, если публикации нет
         """
         statement = select(Post).where(Post.id == post_id)
 
         result = await self.session.execute(statement)
-        return result.scalar_one()
+        return result.scalar_one_or_none()
+
+    async def get_view(self, post_id: int) -> Optional[GetPost]:
+        """
+        Получение DTO публикации через кэш. Текст, автор и дата создания публикации не меняются,
+        поэтому кэшируются надолго, а рейтинг и кол-во голосов берутся из отдельного кэша счётчиков,
+        который обновляется при оценках
+        :param post_id: ID публикации
+        :return: DTO-Модель GetPost либо None, если публикации нет
+        """
+        post = await post_cache.get_or_load(post_id, lambda: self._load_view(post_id))
+        if post is None:
+            return None
+
+        counters = await post_counters_cache.get_or_load(
+            post_id, lambda: self._load_counters(post_id)
+        )
+        return post.model_copy(update=counters) if counters else post
+
+    async def get_views(self, post_ids: list[int]) -> dict[int, GetPost]:
+        """
+        Получение DTO нескольких публикаций. Публикации, которых нет в кэше, и публикации
+        с устаревшими счётчиками загружаются одним запросом
+        :param post_ids: ID публикаций
+        :return: DTO-Модели GetPost найденных публикаций по их ID
+        """
+        views = {}
+        to_load = []
+        for post_id in post_ids:
+            post = post_cache.get(post_id, MISSING)
+            if post is None:
+                continue
+
+            counters = post_counters_cache.get(post_id) if post is not MISSING else None
+            if counters is None:
+                to_load.append(post_id)
+            else:
+                views[post_id] = post.model_copy(update=counters)
+
+        if not to_load:
+            return views
+
+        result = await self.session.execute(select(Post).where(Post.id.in_(to_load)))
+        for post in result.scalars():
+            view = get_post_view(post)
+            post_cache.set(post.id, view)
+            post_counters_cache.set(
+                post.id, {"rating": view.rating, "votes_amount": view.votes_amount}
+            )
+            views[post.id] = view
+
+        for post_id in to_load:
+            if post_id not in views:
+                post_cache.set(post_id, None)
+        return views
+
+    async def _load_view(self, post_id: int) -> Optional[GetPost]:
+        post = await self.get(post_id)
+        if post is None:
+            return None
+
+        view = get_post_view(post)
+        post_counters_cache.set(post_id, {"rating": view.rating, "votes_amount": view.votes_amount})
+        return view
+
+    async def _load_counters(self, post_id: int) -> Optional[dict[str, int]]:
+        statement = select(Post.rating, Post.votes_amount).where(Post.id == post_id)
+        result = await self.session.execute(statement)
+        row = result.first()
+        return row._asdict() if row else None
 
     async def create(
             self,
@@ -32,94 +112,303 @@ class PostsService(BaseDBService):
         :param author: БД-объект автора публикации
         """
 
-        # Мёрджим объект автора в текущую сессию во избежании конфликтов
-        author = await self.session.merge(author)
         post = Post(
             body=body,
             author_id=author.id,
-            author=author,
         )
         self.session.add(post)
-        await self.session.commit()
+        # ID публикации нужен сразу, а фиксация транзакции произойдёт в конце запроса
+        await self.session.flush()
+        self._cache_created([get_post_view(post)])
         return post
 
+    async def create_many(self, bodies: list[str], author: User) -> list[int]:
+        """
+        Пакетное создание публикаций одним многострочным INSERT ... RETURNING
+        :param bodies: Тексты публикаций
+        :param author: БД-объект автора публикаций
+        :return: ID созданных публикаций в порядке переданных текстов
+        """
+        statement = insert(Post).returning(
+            Post.id, Post.body, Post.created, Post.author_id, Post.votes_amount, Post.rating,
+            sort_by_parameter_order=True,
+        )
+        result = await self.session.execute(
+            statement,
+            [{"body": body, "author_id": author.id} for body in bodies],
+        )
+        views = [GetPost.model_validate(row._mapping) for row in result]
+
+        self._cache_created(views)
+        return [view.id for view in views]
+
+    def _cache_created(self, views: list[GetPost]) -> None:
+        """
+        Кэширование созданных публикаций после фиксации транзакции. Публикации кэшируются сразу:
+        их ID могли быть закэшированы как отсутствующие, а реплика для чтения может
+        ещё не получить новые строки
+        :param views: DTO-Модели созданных публикаций
+        """
+        def cache() -> None:
+            for view in views:
+                post_cache.set(view.id, view)
+                post_counters_cache.set(
+                    view.id, {"rating": view.rating, "votes_amount": view.votes_amount}
+                )
+                leaderboard.update(view.id, view.rating)
+
+        self.on_commit(feed_cache.invalidate)
+        self.on_commit(cache)
+
     async def get_posts(
             self,
             amount: int,
-            post_filter: ColumnElement = Post.created
-    ) -> list[GetPost]:
+            sort_keys: Sequence[InstrumentedAttribute] = (Post.created, Post.id),
+            cursor: Optional[str] = None,
+            where: Sequence[ColumnElement[bool]] = (),
+    ) -> PostsPage:
         """
-        Получение постов из БД по указанному фильтру
+        Получение постов из БД по указанному фильтру с keyset-пагинацией.
+        Публикации сортируются по убыванию ключей сортировки, курсор хранит ключи последней
+        выданной публикации, поэтому любая страница выбирается диапазоном по индексу
         :param amount: Кол-во публикаций для вывода
-        :param post_filter: Фильтр SQLAlchemy, по которому будут сортироваться посты.
-        :return: DTO модель GetPost с данными о публикации, её рейтингом и кол-вом голосов
-        """
-        # С помощью этих селектов будем считать рейтинг публикаций
-        upvotes_count = (select(func.count())
-                         .where(Vote.post_id == Post.id)
-                         .where(Vote.type == VoteType.upvote).scalar_subquery())
-        downvotes_count = (select(func.count())
-                           .where(Vote.post_id == Post.id)
-                           .where(Vote.type == VoteType.downvote).scalar_subquery())
-
-        statement = select(Post).order_by(post_filter).limit(amount)
-        statement = statement.add_columns((upvotes_count - downvotes_count).label("rating"))
-        statement = statement.add_columns(
-            select(func.count().label("votes_amount"))
-            .where(Vote.post_id == Post.id).scalar_subquery()
+        :param sort_keys: Колонки, по которым будут сортироваться посты. Последней должен идти ID
+        :param cursor: Курсор страницы, полученный вместе с предыдущей страницей
+        :param where: Дополнительные условия выборки. Для быстрой выборки индекс должен начинаться
+        с колонок условий на равенство, за которыми идут ключи сортировки
+        :return: Страница с DTO моделями GetPost и курсором следующей страницы
+        :raises InvalidCursorError: Курсор повреждён либо выдан для другой сортировки
+        """
+        statement = (
+            select(Post)
+            .where(*where)
+            .order_by(*(desc(key) for key in sort_keys))
+            .limit(amount + 1)
         )
+        if cursor is not None:
+            after = decode_cursor(sort_keys, cursor)
+            statement = statement.where(tuple_(*sort_keys) < tuple_(*after))
+
         result = await self.session.execute(statement)
-        return [
-            GetPost(
-                body=row[0].body,
-                created=row[0].created,
-                author_id=row[0].author_id,
-                rating=row[1],
-                votes_amount=row[2],
-            ) for row in result.all()
-        ]
-
-    async def get_latest_posts(self, amount: int) -> list[GetPost]:
+        posts = list(result.scalars())
+
+        next_cursor = None
+        if len(posts) > amount:
+            posts = posts[:amount]
+            last_values = [getattr(posts[-1], key.key) for key in sort_keys]
+            next_cursor = encode_cursor(sort_keys, last_values)
+
+        return PostsPage(
+            posts=[get_post_view(post) for post in posts],
+            next_cursor=next_cursor,
+        )
+
+    async def get_latest_posts(self, amount: int, cursor: Optional[str] = None) -> PostsPage:
         """
         Получение публикаций, отфильтрованных по дате создания, начиная с самой последней
         :param amount: Кол-во публикаций для вывода
-        :return: Список DTO-Моделей GetPost
+        :param cursor: Курсор страницы
+        :return: Страница с DTO-Моделями GetPost
+        """
+        return await self.get_posts(amount, (Post.created, Post.id), cursor)
+
+    async def get_best_posts(self, amount: int, cursor: Optional[str] = None) -> PostsPage:
+        """
+        Получение публикаций, отфильтрованных по рейтингу, начиная с самой лучшей.
+        Порядок публикаций берётся из списка лучших публикаций в памяти, а из БД
+        лента читается, только если страница выходит за его пределы
+        :param amount: Кол-во публикаций для вывода
+        :param cursor: Курсор страницы
+        :return: Страница с DTO-Моделями GetPost
+        """
+        sort_keys = (Post.rating, Post.id)
+        after = tuple(decode_cursor(sort_keys, cursor)) if cursor is not None else None
+        keys = leaderboard.page(amount, after)
+        if keys is None:
+            return await self.get_posts(amount, sort_keys, cursor)
+
+        next_cursor = None
+        if len(keys) > amount:
+            keys = keys[:amount]
+            next_cursor = encode_cursor(sort_keys, list(keys[-1]))
+
+        views = await self.get_views([post_id for _, post_id in keys])
+        return PostsPage(
+            # Рейтинг из списка в памяти соответствует порядку публикаций в ленте
+            posts=[
+                views[post_id].model_copy(update={"rating": rating})
+                for rating, post_id in keys if post_id in views
+            ],
+            next_cursor=next_cursor,
+        )
+
+    async def get_hot_posts(self, amount: int, cursor: Optional[str] = None) -> PostsPage:
+        """
+        Получение публикаций, отфильтрованных по оценке hot, которая учитывает
+        и рейтинг, и новизну публикации
+        :param amount: Кол-во публикаций для вывода
+        :param cursor: Курсор страницы
+        :return: Страница с DTO-Моделями GetPost
         """
-        return await self.get_posts(amount, desc(Post.created))
+        return await self.get_posts(amount, (Post.hot, Post.id), cursor)
 
-    async def get_best_posts(self, amount: int) -> list[GetPost]:
+    async def get_author_posts(
+            self,
+            author_id: int,
+            amount: int,
+            cursor: Optional[str] = None,
+    ) -> PostsPage:
         """
-        Получение публикаций, отфильтрованных по рейтингу, начиная с самой лучшей
+        Получение публикаций автора, начиная с самой последней
+        :param author_id: ID автора публикаций
         :param amount: Кол-во публикаций для вывода
-        :return: Список DTO-Моделей GetPost
+        :param cursor: Курсор страницы
+        :return: Страница с DTO-Моделями GetPost
+        :raises InvalidCursorError: Курсор повреждён либо выдан для другой сортировки
         """
-        # С помощью этих селектов задаём фильтрацию постов
-        upvotes_count = (select(func.count())
-                         .where(Vote.post_id == Post.id)
-                         .where(Vote.type == VoteType.upvote).scalar_subquery())
-        downvotes_count = (select(func.count())
-                           .where(Vote.post_id == Post.id)
-                           .where(Vote.type == VoteType.downvote).scalar_subquery())
+        return await self.get_posts(
+            amount, (Post.created, Post.id), cursor, where=[Post.author_id == author_id]
+        )
+
+    async def search(
+            self,
+            query: str,
+            amount: int,
+            cursor: Optional[str] = None,
+            blend_rating: bool = False,
+    ) -> PostsPage:
+        """
+        Полнотекстовый поиск публикаций с keyset-пагинацией. Подходящие публикации находятся
+        по GIN индексу поискового вектора и сортируются по убыванию релевантности
+        :param query: Поисковый запрос в синтаксисе веб-поиска: слова, "фразы", or, -исключения
+        :param amount: Кол-во публикаций для вывода
+        :param cursor: Курсор страницы, полученный вместе с предыдущей страницей
+        :param blend_rating: Учитывать рейтинг публикации вместе с релевантностью
+        :return: Страница с DTO-Моделями GetPost и курсором следующей страницы
+        :raises InvalidCursorError: Курсор повреждён либо выдан для другого порядка выдачи
+        """
+        ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+        rank = func.ts_rank_cd(Post.search, ts_query)
+        if blend_rating:
+            rating_weight = func.ln(func.greatest(Post.rating, 0) + 1)
+            rank = rank * (1 + settings.POSTS.SEARCH_RATING_WEIGHT * rating_weight)
+        # Курсор привязан к названию ключа, поэтому курсор
+        # одного порядка выдачи не подойдёт для другого
+        score = cast(rank, Float).label("rating_score" if blend_rating else "score")
+        sort_keys = (score, Post.id)
+
+        statement = (
+            select(Post, score)
+            .where(Post.search.bool_op("@@")(ts_query))
+            .order_by(desc(score), desc(Post.id))
+            .limit(amount + 1)
+        )
+        if cursor is not None:
+            after = decode_cursor(sort_keys, cursor)
+            statement = statement.where(tuple_(score.element, Post.id) < tuple_(*after))
+
+        result = await self.session.execute(statement)
+        rows = list(result)
 
-        return await self.get_posts(amount, desc(upvotes_count - downvotes_count))
+        next_cursor = None
+        if len(rows) > amount:
+            rows = rows[:amount]
+            last_post, last_score = rows[-1]
+            next_cursor = encode_cursor(sort_keys, [last_score, last_post.id])
+
+        return PostsPage(
+            posts=[get_post_view(row.Post) for row in rows],
+            next_cursor=next_cursor,
+        )
+
+    async def get_feed(
+            self,
+            sorting: Filter,
+            amount: int,
+            cursor: Optional[str] = None,
+    ) -> PostsPage:
+        """
+        Получение страницы ленты через кэш. Кэш инвалидируется при создании публикаций, а оценки
+        инвалидируют только ленты, упорядоченные по оценкам. Счётчики публикаций закэшированной
+        страницы обновляются из post_counters_cache, кроме ленты best: в ней порядок публикаций
+        и курсор следующей страницы определяются рейтингом, показанным на странице
+        :param sorting: Признак сортировки ленты
+        :param amount: Кол-во публикаций для вывода
+        :param cursor: Курсор страницы
+        :return: Страница с DTO-Моделями GetPost
+        :raises InvalidCursorError: Курсор повреждён либо выдан для другой сортировки
+        """
+        loaders = {
+            Filter.latest: self.get_latest_posts,
+            Filter.best: self.get_best_posts,
+            Filter.hot: self.get_hot_posts,
+        }
+        page = await feed_cache.get_or_load(
+            (sorting, amount, cursor),
+            lambda: loaders[sorting](amount, cursor),
+        )
+        if sorting == Filter.best:
+            return page
+        return self._with_fresh_counters(page)
 
     @staticmethod
-    async def upvote(post_id: int, user_id: int) -> None:
+    def _with_fresh_counters(page: PostsPage) -> PostsPage:
+        posts = []
+        changed = False
+        for post in page.posts:
+            counters = post_counters_cache.peek(post.id)
+            stale = counters is not None and (
+                counters["rating"] != post.rating or counters["votes_amount"] != post.votes_amount
+            )
+            if stale:
+                post = post.model_copy(update=counters)
+                changed = True
+            posts.append(post)
+        return page.model_copy(update={"posts": posts}) if changed else page
+
+    @classmethod
+    async def export(
+            cls,
+            since_id: Optional[int] = None,
+            since_created: Optional[datetime] = None,
+    ) -> AsyncIterator[list[GetPost]]:
+        """
+        Выгрузка публикаций по возрастанию ID через серверный курсор БД. Публикации читаются
+        пачками по EXPORT_CHUNK_SIZE, поэтому память не зависит от кол-ва публикаций.
+        Выгрузка открывает собственную сессию, так как идёт уже после завершения обработчика запроса
+        :param since_id: Выгружать публикации с ID больше указанного
+        :param since_created: Выгружать публикации, созданные не раньше указанного времени
+        :return: Асинхронный итератор пачек DTO-Моделей GetPost
+        """
+        statement = (
+            select(Post.id, Post.body, Post.created, Post.author_id, Post.votes_amount, Post.rating)
+            .order_by(Post.id)
+            .execution_options(yield_per=settings.POSTS.EXPORT_CHUNK_SIZE)
+        )
+        if since_id is not None:
+            statement = statement.where(Post.id > since_id)
+        if since_created is not None:
+            statement = statement.where(Post.created >= since_created)
+
+        async with asynccontextmanager(cls.get_async_readonly_session)() as session:
+            result = await session.stream(statement)
+            async for rows in result.partitions():
+                yield [GetPost.model_validate(row._mapping) for row in rows]
+
+    async def upvote(self, post_id: int, user_id: int) -> bool:
         """
         Присвоение посту оценки upvote
         :param post_id: ID публикации, которую нужно оценить
         :param user_id: ID пользователя, поставившего оценку
+        :return: True, если оценка изменилась
         """
-        await rating_service.create_vote(user_id, post_id, VoteType.upvote)
+        return await RatingService(self.session).set_vote(post_id, user_id, VoteType.upvote)
 
-    @staticmethod
-    async def downvote(post_id: int, user_id: int) -> None:
+    async def downvote(self, post_id: int, user_id: int) -> bool:
         """
-        Присвоение посту оценки upvote
+        Присвоение посту оценки downvote
         :param post_id: ID публикации, которую нужно оценить
         :param user_id: ID пользователя, поставившего оценку
+        :return: True, если оценка изменилась
         """
-        await rating_service.create_vote(user_id, post_id, VoteType.downvote)
-
-
-posts_service = PostsService()
+        return await RatingService(self.session).set_vote(post_id, user_id, VoteType.downvote)
@@ -1,89 +1,312 @@
+from collections import defaultdict
+from contextlib import asynccontextmanager
 from typing import Optional
 
+from sqlalchemy import (
+    Boolean, Integer, Update, and_, case, column, delete, desc, literal, literal_column, tuple_,
+    update, values,
+)
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.future import select
 
+from config.config import settings
+from src.services.cache.leaderboard import Leaderboard, RatingKey
+from src.services.cache.posts import feed_cache, is_rating_ordered_feed, post_counters_cache
 from src.services.db.base import BaseDBService
-from src.models.db import Vote
+from src.services.votes.buffer import VoteBuffer, VoteChanges
+from src.models.db import Post, Vote
 from src.enums.rating import VoteType
 
 
 class RatingService(BaseDBService):
-    async def create_vote(self, user_id: int, post_id: int, vote_type: VoteType) -> None:
+    # Кол-во оценок в одном запросе пакетной записи, ограничено кол-вом параметров запроса
+    VOTES_CHUNK_SIZE = 5000
+
+    async def set_vote(self, post_id: int, user_id: int, vote_type: Optional[VoteType]) -> bool:
         """
-        Создание оценки в БД
+        Установка оценки пользователя на публикации одним запросом к БД.
+        Оценка и счётчики публикации меняются атомарно, уникальный индекс (post_id, user_id)
+        не позволяет конкурентным запросам создать повторную оценку
+        :param post_id: ID публикации, на которую ставится оценка
         :param user_id: ID пользователя, поставившего оценку
-        :param post_id: ID публикации, на которую поставлена оценка
-        :param vote_type: Тип оценки (upvote/downvote)
+        :param vote_type: Тип оценки (upvote/downvote) либо None для отмены оценки
+        :return: True, если оценка изменилась, False, если пользователь уже поставил
+        такую оценку (или не оценивал публикацию при отмене) либо публикации не существует
         """
-        vote = Vote(
-            user_id=user_id,
-            post_id=post_id,
-            type=vote_type,
+        if vote_buffer.running:
+            return await self._buffer_vote(post_id, user_id, vote_type)
+
+        if vote_type is None:
+            statement = self._cancel_vote_statement(post_id, user_id)
+        else:
+            statement = self._upsert_vote_statement(post_id, user_id, vote_type)
+
+        result = await self.session.execute(
+            statement, execution_options={"synchronize_session": False}
         )
-        self.session.add(vote)
-        await self.session.commit()
+        counters = result.first()
+        if counters is None:
+            return False
 
-    async def is_post_voted_by_user(self, post_id: int, user_id: int) -> bool:
+        # Оценка меняет порядок лент best и hot, а счётчики публикаций
+        # в остальных лентах обновляются из post_counters_cache
+        self.on_commit(lambda: feed_cache.invalidate(is_rating_ordered_feed))
+        self.on_commit(lambda: post_counters_cache.set(
+            post_id, {"rating": counters.rating, "votes_amount": counters.votes_amount}
+        ))
+        self.on_commit(lambda: leaderboard.update(post_id, counters.rating))
+        return True
+
+    async def _buffer_vote(self, post_id: int, user_id: int, vote_type: Optional[VoteType]) -> bool:
         """
-        Проверка на то, оценивал ли пользователь публикацию
-        :param post_id: ID публикации, которую нужно проверить
-        :param user_id: ID пользователя, который мог поставить оценку
-        :return: True/False
+        Установка оценки в режиме отложенной записи. Наличие публикации и текущая оценка
+        пользователя проверяются одним запросом с учётом ещё не записанных в БД оценок
         """
-        vote = await self.get_user_post_vote(post_id, user_id)
-        return vote is not None
+        statement = (
+            select(Post.id, Vote.type)
+            .outerjoin(Vote, and_(Vote.post_id == Post.id, Vote.user_id == user_id))
+            .where(Post.id == post_id)
+        )
+        result = await self.session.execute(statement)
+        row = result.first()
+        if row is None:
+            return False
 
-    async def cancel_user_vote(self, post_id: int, user_id: int) -> None:
+        if vote_buffer.get(post_id, user_id, row.type) == vote_type:
+            return False
+
+        vote_buffer.add(post_id, user_id, vote_type)
+        return True
+
+    @classmethod
+    async def flush_votes(cls, votes: VoteChanges) -> None:
         """
-        Отмена оценки пользователя на конкретной публикации
-        :param post_id: ID публикации, на которую была поставлена оценка
-        :param user_id: ID пользователя, который поставил оценку
+        Запись пачки изменений оценок из буфера в отдельной транзакции
+        :param votes: Итоговые оценки пользователей по ключу (ID публикации, ID пользователя)
         """
-        if not await self.is_post_voted_by_user(post_id, user_id):
-            return
+        async with asynccontextmanager(cls.get_async_session)() as session:
+            await cls(session).apply_votes(votes)
 
-        vote = await self.get_user_post_vote(post_id, user_id)
-        await self.session.delete(vote)
-        await self.session.commit()
+    @classmethod
+    async def load_best_ratings(cls, limit: int) -> list[RatingKey]:
+        """
+        Загрузка ключей лучших по рейтингу публикаций для списка в памяти
+        :param limit: Кол-во публикаций
+        :return: Пары (рейтинг, ID публикации) по убыванию
+        """
+        async with asynccontextmanager(cls.get_async_session)() as session:
+            statement = (
+                select(Post.rating, Post.id)
+                .order_by(desc(Post.rating), desc(Post.id))
+                .limit(limit)
+            )
+            result = await session.execute(statement)
+            return [(row.rating, row.id) for row in result]
 
-    async def get_user_post_vote(self, post_id: int, user_id: int) -> Optional[Vote]:
+    async def apply_votes(self, votes: VoteChanges) -> None:
         """
-        Получение БД объекта оценки пользователя на конкретной публикации
-        :param post_id: ID публикации, из которой нужно получить оценку
-        :param user_id: ID пользователя, который поставил оценку
-        :return: БД-объект оценки либо None, если пользователь не оценивал указанную публикацию
+        Пакетное применение изменений оценок: все новые и изменённые оценки записываются
+        через INSERT ... ON CONFLICT, отменённые удаляются одним DELETE, а счётчики всех
+        затронутых публикаций обновляются одним UPDATE. Изменения счётчиков считаются по
+        RETURNING этих запросов, поэтому повторное применение тех же оценок ничего не меняет
+        :param votes: Итоговые оценки пользователей по ключу (ID публикации, ID пользователя)
         """
-        statement = select(Vote).where(Vote.post_id == post_id).where(Vote.user_id == user_id)
-        result = await self.session.execute(statement)
+        # Изменения счётчиков upvotes, downvotes, votes_amount по ID публикации
+        deltas: dict[int, list[int]] = defaultdict(lambda: [0, 0, 0])
 
-        result = result.scalar()
-        if not result:
+        # Сортировка задаёт одинаковый порядок блокировок строк в конкурентных транзакциях
+        keys = sorted(votes)
+        upserts = [
+            {"post_id": post_id, "user_id": user_id, "type": votes[(post_id, user_id)].value}
+            for post_id, user_id in keys if votes[(post_id, user_id)] is not None
+        ]
+        cancels = [key for key in keys if votes[key] is None]
+
+        for start in range(0, len(upserts), self.VOTES_CHUNK_SIZE):
+            upsert = insert(Vote).values(upserts[start:start + self.VOTES_CHUNK_SIZE])
+            upsert = upsert.on_conflict_do_update(
+                index_elements=[Vote.post_id, Vote.user_id],
+                set_={"type": upsert.excluded.type},
+                where=Vote.type.is_distinct_from(upsert.excluded.type),
+            ).returning(
+                Vote.post_id, Vote.type, literal_column("xmax = 0", Boolean).label("inserted")
+            )
+
+            for row in await self.session.execute(upsert):
+                added, removed = (0, 1) if row.type == VoteType.upvote else (1, 0)
+                delta = deltas[row.post_id]
+                delta[added] += 1
+                if row.inserted:
+                    delta[2] += 1
+                else:
+                    delta[removed] -= 1
+
+        for start in range(0, len(cancels), self.VOTES_CHUNK_SIZE):
+            statement = (
+                delete(Vote)
+                .where(tuple_(Vote.post_id, Vote.user_id).in_(
+                    cancels[start:start + self.VOTES_CHUNK_SIZE]
+                ))
+                .returning(Vote.post_id, Vote.type)
+            )
+            for row in await self.session.execute(statement):
+                delta = deltas[row.post_id]
+                delta[0 if row.type == VoteType.upvote else 1] -= 1
+                delta[2] -= 1
+
+        rows = [(post_id, *delta) for post_id, delta in sorted(deltas.items()) if any(delta)]
+        if not rows:
             return
-        return result
 
-    async def get_post_votes(self, post_id: int) -> list[Vote]:
+        delta_values = values(
+            column("post_id", Integer),
+            column("upvotes", Integer),
+            column("downvotes", Integer),
+            column("votes_amount", Integer),
+            name="deltas",
+        ).data(rows)
+        statement = (
+            update(Post)
+            .where(Post.id == delta_values.c.post_id)
+            .values({
+                Post.upvotes: Post.upvotes + delta_values.c.upvotes,
+                Post.downvotes: Post.downvotes + delta_values.c.downvotes,
+                Post.votes_amount: Post.votes_amount + delta_values.c.votes_amount,
+            })
+            .returning(Post.id, Post.rating, Post.votes_amount)
+        )
+        result = await self.session.execute(
+            statement, execution_options={"synchronize_session": False}
+        )
+        counters = {
+            row.id: {"rating": row.rating, "votes_amount": row.votes_amount} for row in result
+        }
+
+        self.on_commit(lambda: feed_cache.invalidate(is_rating_ordered_feed))
+        self.on_commit(lambda: [
+            post_counters_cache.set(post_id, post_counters)
+            for post_id, post_counters in counters.items()
+        ])
+        self.on_commit(lambda: [
+            leaderboard.update(post_id, post_counters["rating"])
+            for post_id, post_counters in counters.items()
+        ])
+
+    async def cancel_user_vote(self, post_id: int, user_id: int) -> bool:
         """
-        Получить все оценки на конкретной публикации
-        :param post_id: ID публикации, оценки которой нужно получить
-        :return: Список БД-объектов оценок
+        Отмена оценки пользователя на конкретной публикации
+        :param post_id: ID публикации, на которую была поставлена оценка
+        :param user_id: ID пользователя, который поставил оценку
+        :return: True, если оценка была отменена, False, если пользователь не оценивал публикацию
         """
-        statement = select(Vote).where(Vote.post_id == post_id)
+        return await self.set_vote(post_id, user_id, None)
+
+    async def get_user_votes(self, user_id: int, post_ids: list[int]) -> dict[int, VoteType]:
+        """
+        Получение оценок пользователя на нескольких публикациях одним запросом
+        по покрывающему индексу (user_id, post_id), с учётом ещё не записанных в БД оценок
+        :param user_id: ID пользователя
+        :param post_ids: ID публикаций
+        :return: Типы оценок по ID публикаций, которые пользователь оценил
+        """
+        if not post_ids:
+            return {}
+
+        statement = (
+            select(Vote.post_id, Vote.type)
+            .where(Vote.user_id == user_id)
+            .where(Vote.post_id.in_(post_ids))
+        )
         result = await self.session.execute(statement)
-        return list(result.scalars())
+        votes = {row.post_id: VoteType(row.type) for row in result}
 
-    async def get_post_rating(self, post_id: int) -> int:
+        if vote_buffer.running:
+            for post_id in post_ids:
+                vote_type = vote_buffer.get(post_id, user_id, votes.get(post_id))
+                if vote_type is None:
+                    votes.pop(post_id, None)
+                else:
+                    votes[post_id] = vote_type
+        return votes
+
+    @staticmethod
+    def _upsert_vote_statement(post_id: int, user_id: int, vote_type: VoteType) -> Update:
         """
-        Расчёт рейтинга конкретной публикации. Рейтинг высчитывается по формуле:
-        upvotes - downvotes
-        :param post_id: ID публикации, рейтинг которой нужно посчитать
-        :return: Рейтинг публикации в целочисленном формате
+        Запрос, создающий оценку либо меняющий её тип, вместе с обновлением счётчиков публикации.
+        Вставка идёт через SELECT из posts, поэтому для несуществующей публикации
+        ничего не меняется.
+        Признак xmax = 0 отличает вставку новой оценки от смены типа существующей
         """
-        votes = await self.get_post_votes(post_id)
+        vote_values = select(
+            Post.id,
+            literal(user_id),
+            literal(vote_type.value, Vote.type.type),
+        ).where(Post.id == post_id)
+
+        upsert = insert(Vote).from_select(["post_id", "user_id", "type"], vote_values)
+        upsert = upsert.on_conflict_do_update(
+            index_elements=[Vote.post_id, Vote.user_id],
+            set_={"type": upsert.excluded.type},
+            where=Vote.type.is_distinct_from(upsert.excluded.type),
+        )
+        changed = upsert.returning(
+            Vote.post_id,
+            literal_column("xmax = 0", Boolean).label("inserted"),
+        ).cte("changed_vote")
+
+        # При смене типа оценки противоположный счётчик уменьшается, а общее кол-во не меняется
+        added, removed = (
+            (Post.upvotes, Post.downvotes) if vote_type == VoteType.upvote
+            else (Post.downvotes, Post.upvotes)
+        )
+        return (
+            update(Post)
+            .where(Post.id == changed.c.post_id)
+            .values({
+                added: added + 1,
+                removed: removed - case((changed.c.inserted, 0), else_=1),
+                Post.votes_amount: Post.votes_amount + case((changed.c.inserted, 1), else_=0),
+            })
+            .returning(Post.id, Post.rating, Post.votes_amount)
+        )
 
-        upvotes = [vote for vote in votes if vote.type == VoteType.upvote]
-        downvotes = [vote for vote in votes if vote.type == VoteType.downvote]
+    @staticmethod
+    def _cancel_vote_statement(post_id: int, user_id: int) -> Update:
+        """
+        Запрос, удаляющий оценку вместе с обновлением счётчиков публикации
+        """
+        deleted = (
+            delete(Vote)
+            .where(Vote.post_id == post_id)
+            .where(Vote.user_id == user_id)
+            .returning(Vote.post_id, Vote.type)
+            .cte("deleted_vote")
+        )
+        return (
+            update(Post)
+            .where(Post.id == deleted.c.post_id)
+            .values({
+                Post.upvotes: Post.upvotes - case(
+                    (deleted.c.type == VoteType.upvote, 1), else_=0
+                ),
+                Post.downvotes: Post.downvotes - case(
+                    (deleted.c.type == VoteType.downvote, 1), else_=0
+                ),
+                Post.votes_amount: Post.votes_amount - 1,
+            })
+            .returning(Post.id, Post.rating, Post.votes_amount)
+        )
 
-        return len(upvotes) - len(downvotes)
 
+vote_buffer = VoteBuffer(
+    flush=RatingService.flush_votes,
+    interval=settings.VOTES.FLUSH_INTERVAL_MS / 1000,
+    max_events=settings.VOTES.FLUSH_MAX_EVENTS,
+)
 
-rating_service = RatingService()
+leaderboard = Leaderboard(
+    load=RatingService.load_best_ratings,
+    size=settings.LEADERBOARD.SIZE,
+    margin=settings.LEADERBOARD.MARGIN,
+    interval=settings.LEADERBOARD.RESYNC_INTERVAL,
+)
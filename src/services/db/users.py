@@ -14,6 +14,3 @@ class UserService(BaseDBService):
         Фактори адаптера базы данных для работы с пользователями
         """
         yield SQLAlchemyUserDatabase(session, User)
-
-
-user_service = UserService()
@@ -0,0 +1,150 @@
+import asyncio
+import json
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from config.config import settings
+from src.services.metrics.registry import REJECTED_REQUESTS
+
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+OVERLOADED_DETAIL = "Service is overloaded, retry later"
+
+
+def pool_capacity() -> int:
+    """
+    Кол-во соединений, которое может выдать пул одного движка БД
+    """
+    return settings.POSTGRES.POOL_SIZE + settings.POSTGRES.MAX_OVERFLOW
+
+
+def read_limit() -> int:
+    """
+    Максимум одновременных запросов на чтение. По умолчанию равен кол-ву соединений,
+    доступных для чтения, за вычетом соединений, отданных выгрузкам
+    """
+    admission = settings.ADMISSION
+    if admission.MAX_READS is not None:
+        return admission.MAX_READS
+    capacity = pool_capacity() * max(len(settings.POSTGRES.REPLICAS), 1)
+    return max(capacity - admission.MAX_EXPORTS, 1)
+
+
+def write_limit() -> int:
+    """
+    Максимум одновременных запросов на запись. По умолчанию равен ёмкости пула основной БД
+    """
+    if settings.ADMISSION.MAX_WRITES is not None:
+        return settings.ADMISSION.MAX_WRITES
+    return pool_capacity()
+
+
+class Gate:
+    """
+    Ограничение кол-ва одновременно обрабатываемых запросов. Запрос, не получивший места,
+    ждёт не дольше timeout секунд, а при переполненной очереди отклоняется сразу
+    """
+
+    def __init__(self, limit: int, max_queue: int, timeout: float):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+
+        self._semaphore = asyncio.Semaphore(limit)
+        self._waiting = 0
+
+    async def acquire(self) -> bool:
+        """
+        Занятие места для запроса
+        :return: True, если место получено, False, если запрос нужно отклонить
+        """
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            return True
+        if self._waiting >= self.max_queue:
+            return False
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._waiting -= 1
+        return True
+
+    def release(self) -> None:
+        """
+        Освобождение места после обработки запроса
+        """
+        self._semaphore.release()
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware, ограничивающее кол-во одновременно обрабатываемых запросов в процессе
+    отдельно для чтения, записи и выгрузок. Когда БД не справляется, лишние запросы быстро
+    получают 503 с заголовком Retry-After вместо того, чтобы копиться в очереди к пулу соединений
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+        admission = settings.ADMISSION
+        self.gates = {
+            "read": Gate(read_limit(), admission.MAX_QUEUE, admission.QUEUE_TIMEOUT),
+            "write": Gate(write_limit(), admission.MAX_QUEUE, admission.QUEUE_TIMEOUT),
+            "export": Gate(admission.MAX_EXPORTS, admission.MAX_QUEUE, admission.QUEUE_TIMEOUT),
+        }
+        self.exempt_paths = tuple(admission.EXEMPT_PATHS)
+        self.export_paths = tuple(admission.EXPORT_PATHS)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+
+        if scope["path"].startswith(self.export_paths):
+            kind = "export"
+        elif scope["method"] in READ_METHODS:
+            kind = "read"
+        else:
+            kind = "write"
+        gate = self.gates[kind]
+        if not await gate.acquire():
+            REJECTED_REQUESTS.labels(kind).inc()
+            await self._reject(send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+    @staticmethod
+    async def _reject(send: Send) -> None:
+        body = json.dumps({"detail": OVERLOADED_DETAIL}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(settings.ADMISSION.RETRY_AFTER).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+async def pool_timeout_handler(_: Request, __: Exception) -> JSONResponse:
+    """
+    Обработчик запросов, не дождавшихся свободного соединения из пула основной БД.
+    Такой запрос, как и не получивший места, отклоняется с 503 и заголовком Retry-After
+    """
+    REJECTED_REQUESTS.labels("pool").inc()
+    return JSONResponse(
+        {"detail": OVERLOADED_DETAIL},
+        status_code=503,
+        headers={"Retry-After": str(settings.ADMISSION.RETRY_AFTER)},
+    )
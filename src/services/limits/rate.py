@@ -0,0 +1,58 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from config.config import settings
+
+
+class TokenBucketLimiter:
+    """
+    Ограничение частоты действий по ключу (например, пользователю) алгоритмом token bucket:
+    у каждого ключа есть запас из burst действий, который пополняется со скоростью rate в секунду.
+    Хранится не больше max_keys ключей, давно не использованные вытесняются
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+
+        # Ключ - (кол-во доступных действий, время последнего пополнения)
+        self._buckets: OrderedDict[Hashable, tuple[float, float]] = OrderedDict()
+
+    def acquire(self, key: Hashable) -> float:
+        """
+        Попытка выполнить действие от имени ключа
+        :param key: Ключ, например ID пользователя
+        :return: 0, если действие разрешено, иначе время в секундах до появления следующего действия
+        """
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+        return 0 if allowed else (1 - tokens) / self.rate
+
+    @staticmethod
+    def retry_after(wait: float) -> str:
+        """
+        Значение заголовка Retry-After в целых секундах
+        :param wait: Время ожидания в секундах
+        """
+        return str(max(1, math.ceil(wait)))
+
+
+# Ограничение частоты оценок одним пользователем, None - ограничение отключено
+vote_limiter: Optional[TokenBucketLimiter] = TokenBucketLimiter(
+    rate=settings.ADMISSION.VOTE_RATE,
+    burst=settings.ADMISSION.VOTE_BURST,
+    max_keys=settings.ADMISSION.VOTE_MAX_USERS,
+) if settings.ADMISSION.VOTE_RATE else None
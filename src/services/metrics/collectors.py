@@ -0,0 +1,90 @@
+from typing import Callable, Iterable, Optional
+
+from prometheus_client import REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.services.cache.registry import CACHES
+
+
+class PoolCollector(Collector):
+    """
+    Состояние пулов соединений с основной БД и репликами, снимается в момент сбора метрик
+    """
+
+    def __init__(
+            self,
+            get_engine: Callable[[], AsyncEngine],
+            get_replica_engines: Optional[Callable[[], list[AsyncEngine]]] = None,
+    ):
+        self.get_engine = get_engine
+        self.get_replica_engines = get_replica_engines
+
+    def collect(self) -> Iterable[Metric]:
+        size = GaugeMetricFamily(
+            "db_pool_size", "Configured connection pool size", labels=["engine"]
+        )
+        checked_out = GaugeMetricFamily(
+            "db_pool_checked_out", "Connections checked out of the pool", labels=["engine"]
+        )
+        overflow = GaugeMetricFamily(
+            "db_pool_overflow", "Connections opened over the pool size", labels=["engine"]
+        )
+
+        engines = {"primary": self.get_engine()}
+        if self.get_replica_engines:
+            for index, engine in enumerate(self.get_replica_engines()):
+                engines[f"replica-{index}"] = engine
+
+        for name, engine in engines.items():
+            pool = engine.pool
+            size.add_metric([name], pool.size())
+            checked_out.add_metric([name], pool.checkedout())
+            overflow.add_metric([name], max(pool.overflow(), 0))
+
+        yield from (size, checked_out, overflow)
+
+
+class CacheCollector(Collector):
+    """
+    Статистика кэшей сервиса
+    """
+
+    def collect(self) -> Iterable[Metric]:
+        hits = CounterMetricFamily("cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Cache misses", labels=["cache"])
+        coalesced = CounterMetricFamily(
+            "cache_coalesced", "Cache misses served by an in-flight load", labels=["cache"]
+        )
+        size = GaugeMetricFamily("cache_size", "Cache entries", labels=["cache"])
+
+        for name, cache in CACHES.items():
+            stats = cache.stats()
+            hits.add_metric([name], stats["hits"])
+            misses.add_metric([name], stats["misses"])
+            coalesced.add_metric([name], stats["coalesced"])
+            size.add_metric([name], stats["size"])
+
+        yield from (hits, misses, coalesced, size)
+
+
+_registered = False
+
+
+def register_collectors(
+        get_engine: Callable[[], AsyncEngine],
+        get_replica_engines: Optional[Callable[[], list[AsyncEngine]]] = None,
+) -> None:
+    """
+    Регистрация сборщиков метрик, значения которых снимаются только в момент сбора
+    :param get_engine: Функция, возвращающая движок основной БД текущего процесса
+    :param get_replica_engines: Функция, возвращающая движки реплик текущего процесса
+    """
+    global _registered  # pylint: disable=global-statement
+    if _registered:
+        return
+
+    REGISTRY.register(PoolCollector(get_engine, get_replica_engines))
+    REGISTRY.register(CacheCollector())
+    _registered = True
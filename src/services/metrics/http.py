@@ -0,0 +1,47 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.services.metrics.registry import REQUEST_DURATION, REQUEST_QUERIES, REQUEST_SQL_DURATION
+from src.services.metrics.sql import RequestDBStats, current_request_stats
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware, замеряющее длительность HTTP-запросов, кол-во и время выполненных SQL-запросов.
+    Запросы группируются по шаблону пути маршрута, а не по фактическому пути,
+    чтобы ID в пути не порождали неограниченное кол-во меток
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestDBStats()
+        token = current_request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request_stats.reset(token)
+
+            # Маршрут записывается в scope роутером после сопоставления пути
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            REQUEST_DURATION.labels(method, path, str(status)).observe(elapsed)
+            REQUEST_QUERIES.labels(method, path).observe(stats.queries)
+            REQUEST_SQL_DURATION.labels(method, path).observe(stats.seconds)
@@ -0,0 +1,43 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Границы корзин гистограмм кол-ва SQL-запросов на один HTTP-запрос
+QUERIES_BUCKETS = (0, 1, 2, 3, 4, 5, 8, 13, 21, 34, 55)
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request duration",
+    ["method", "route", "status"],
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "SQL queries executed while handling an HTTP request",
+    ["method", "route"],
+    buckets=QUERIES_BUCKETS,
+)
+REQUEST_SQL_DURATION = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent in SQL queries while handling an HTTP request",
+    ["method", "route"],
+)
+QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "SQL query duration",
+)
+REJECTED_REQUESTS = Counter(
+    "http_requests_rejected_total",
+    "Requests rejected by admission control or rate limits",
+    ["kind"],
+)
+SLOW_QUERIES = Counter(
+    "db_slow_queries_total",
+    "SQL queries slower than the configured threshold",
+)
+PASSWORD_TASKS = Gauge(
+    "password_hasher_tasks",
+    "Password hashing operations submitted to the executor and not finished yet",
+)
+PASSWORD_QUEUE_WAIT = Histogram(
+    "password_hasher_queue_wait_seconds",
+    "Time password hashing operations wait for a free executor worker",
+    ["operation"],
+)
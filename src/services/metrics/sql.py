@@ -0,0 +1,79 @@
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import ExceptionContext
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config.config import settings
+from src.services.metrics.registry import QUERY_DURATION, SLOW_QUERIES
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RequestDBStats:
+    """
+    Кол-во и суммарное время SQL-запросов в рамках одного HTTP-запроса
+    """
+    queries: int = 0
+    seconds: float = 0.0
+
+
+current_request_stats: ContextVar[Optional[RequestDBStats]] = ContextVar(
+    "current_request_stats", default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    # pylint: disable=unused-argument,too-many-arguments
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    # pylint: disable=unused-argument,too-many-arguments
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+
+    if settings.METRICS.ENABLED:
+        QUERY_DURATION.observe(elapsed)
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.seconds += elapsed
+
+    slow_query_ms = settings.METRICS.SLOW_QUERY_MS
+    if slow_query_ms is not None and elapsed * 1000 >= slow_query_ms:
+        SLOW_QUERIES.inc()
+        logger.warning(
+            "Slow query (%.1f ms): %s; parameters: %r", elapsed * 1000, statement, parameters
+        )
+
+
+def _handle_error(context: ExceptionContext) -> None:
+    # after_cursor_execute не вызывается для упавшего запроса, поэтому его время начала
+    # убирается здесь, иначе оно осталось бы в соединении пула и сбило бы замеры следующих запросов
+    if context.connection is None or context.execution_context is None:
+        return
+
+    started = context.connection.info.get("query_started")
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """
+    Подключение сбора метрик SQL-запросов и журнала медленных запросов к движку БД.
+    Если и метрики, и журнал отключены, обработчики событий не регистрируются
+    :param engine: Асинхронный движок БД
+    """
+    if not settings.METRICS.ENABLED and settings.METRICS.SLOW_QUERY_MS is None:
+        return
+
+    sync_engine = engine.sync_engine
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(sync_engine, "handle_error", _handle_error)
@@ -1,19 +1,47 @@
-from fastapi_users import FastAPIUsers
+from typing import Optional
+
+import jwt
+from fastapi_users import FastAPIUsers, exceptions
 from fastapi_users.authentication import AuthenticationBackend, BearerTransport, JWTStrategy
+from fastapi_users.jwt import decode_jwt
 
-from src.services.users.manager import get_user_manager
+from src.services.users.manager import UserManager, get_user_manager
 from src.models.db.user import User
 from config.config import settings
 
 bearer_transport = BearerTransport(tokenUrl="login")
 
 
+class CachedJWTStrategy(JWTStrategy[User, int]):
+    async def read_token(self, token: Optional[str], user_manager: UserManager) -> Optional[User]:
+        """
+        Получение пользователя по JWT-токену. В отличие от базовой стратегии пользователь
+        берётся из кэша, поэтому большинство запросов обходится без обращения к БД
+        """
+        if token is None:
+            return None
+
+        try:
+            data = decode_jwt(
+                token, self.decode_key, self.token_audience, algorithms=[self.algorithm]
+            )
+        except jwt.PyJWTError:
+            return None
+        if data.get("sub") is None:
+            return None
+
+        try:
+            return await user_manager.get_cached(user_manager.parse_id(data["sub"]))
+        except (exceptions.UserNotExists, exceptions.InvalidID):
+            return None
+
+
 def get_jwt_strategy() -> JWTStrategy:
     """
     Фактори стратегии аутентификации для последующей
     конфигурации работы всей аутентификации в сервисе
     """
-    return JWTStrategy(secret=settings.AUTH.SECRET, lifetime_seconds=3600)
+    return CachedJWTStrategy(secret=settings.AUTH.SECRET, lifetime_seconds=3600)
 
 
 auth_backend = AuthenticationBackend(
@@ -28,9 +56,10 @@ user_auth = FastAPIUsers[User, int](
 )
 
 
-def get_current_user():
+def get_current_user(optional: bool = False):
     """
     Получение текущего пользователя в рамках запроса к ручке,
     используется в качестве зависимости FastAPI
+    :param optional: Не требовать авторизации, для анонимного запроса зависимость вернёт None
     """
-    return user_auth.current_user()
+    return user_auth.current_user(optional=optional)
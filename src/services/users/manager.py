@@ -1,15 +1,142 @@
-from fastapi import Depends
-from fastapi_users import BaseUserManager, IntegerIDMixin
+from typing import Any, Awaitable, Optional
 
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import OAuth2PasswordRequestForm
+from fastapi_users import BaseUserManager, IntegerIDMixin, exceptions
+
+from config.config import settings
 from src.models.db.user import User
-from src.services.db.users import user_service
+from src.models.dto.user import CreateUser
+from src.services.cache.users import author_cache, user_cache
+from src.services.db.users import UserService
+from src.services.metrics.registry import REJECTED_REQUESTS
+from src.services.users.passwords import HasherOverloadedError, password_hasher
+
+
+async def _run_hasher(operation: Awaitable) -> Any:
+    # Переполненная очередь хэширования означает всплеск входов и регистраций,
+    # клиенту предлагается повторить позже
+    try:
+        return await operation
+    except HasherOverloadedError as error:
+        REJECTED_REQUESTS.labels("password").inc()
+        raise HTTPException(
+            503,
+            detail="Service is overloaded, retry later",
+            headers={"Retry-After": str(settings.ADMISSION.RETRY_AFTER)},
+        ) from error
 
 
 class UserManager(IntegerIDMixin, BaseUserManager[User, int]):
-    pass
+    """
+    Менеджер пользователей. Хэширование и проверка паролей выполняются в пуле password_hasher,
+    поэтому методы BaseUserManager, которые хэшируют пароль в цикле событий, переопределены
+    """
+
+    async def create(
+            self,
+            user_create: CreateUser,
+            safe: bool = False,
+            request: Optional[Request] = None,
+    ) -> User:
+        """
+        Создание пользователя, повторяет BaseUserManager.create
+        :param user_create: Данные нового пользователя
+        :param safe: Игнорировать служебные поля, например is_superuser
+        :param request: Запрос, в рамках которого создаётся пользователь
+        :return: БД-объект созданного пользователя
+        :raises UserAlreadyExists: Пользователь с такой почтой уже существует
+        """
+        await self.validate_password(user_create.password, user_create)
+
+        existing_user = await self.user_db.get_by_email(user_create.email)
+        if existing_user is not None:
+            raise exceptions.UserAlreadyExists()
+
+        if safe:
+            user_dict = user_create.create_update_dict()
+        else:
+            user_dict = user_create.create_update_dict_superuser()
+        password = user_dict.pop("password")
+        user_dict["hashed_password"] = await _run_hasher(password_hasher.hash(password))
+
+        created_user = await self.user_db.create(user_dict)
+        await self.on_after_register(created_user, request)
+        return created_user
+
+    async def authenticate(self, credentials: OAuth2PasswordRequestForm) -> Optional[User]:
+        """
+        Аутентификация по почте и паролю, повторяет BaseUserManager.authenticate
+        :param credentials: Почта и пароль пользователя
+        :return: БД-объект пользователя либо None, если почта или пароль неверны
+        """
+        try:
+            user = await self.get_by_email(credentials.username)
+        except exceptions.UserNotExists:
+            # Пароль всё равно хэшируется, чтобы по времени ответа
+            # нельзя было узнать, есть ли пользователь
+            await _run_hasher(password_hasher.hash(credentials.password))
+            return None
+
+        verified, updated_password_hash = await _run_hasher(
+            password_hasher.verify_and_update(credentials.password, user.hashed_password)
+        )
+        if not verified:
+            return None
+        if updated_password_hash is not None:
+            await self.user_db.update(user, {"hashed_password": updated_password_hash})
+        return user
+
+    async def _update(self, user: User, update_dict: dict[str, Any]) -> User:
+        # Новый пароль хэшируется заранее, остальные поля обновляет BaseUserManager
+        password = update_dict.get("password")
+        if password is not None:
+            await self.validate_password(password, user)
+            update_dict = {
+                field: value for field, value in update_dict.items() if field != "password"
+            }
+            update_dict["hashed_password"] = await _run_hasher(password_hasher.hash(password))
+        return await super()._update(user, update_dict)
+
+    async def get_cached(self, user_id: int) -> User:
+        """
+        Получение пользователя через кэш. Кэшируются только активные пользователи,
+        записи удаляются из кэша при любом изменении пользователя
+        :param user_id: ID пользователя
+        :return: БД-объект пользователя, отсоединённый от сессии
+        :raises UserNotExists: Пользователя не существует
+        """
+        user = user_cache.get(user_id)
+        if user is None:
+            user = await self.get(user_id)
+            if user.is_active:
+                # Отсоединяем объект от сессии запроса,
+                # иначе откат её транзакции сбросит его атрибуты
+                self.user_db.session.expunge(user)
+                user_cache.set(user_id, user)
+        return user
+
+    async def on_after_update(
+            self,
+            user: User,
+            update_dict: dict,
+            request: Optional[Request] = None,
+    ) -> None:
+        user_cache.delete(user.id)
+        author_cache.delete(user.id)
+
+    async def on_after_verify(self, user: User, request: Optional[Request] = None) -> None:
+        user_cache.delete(user.id)
+
+    async def on_after_reset_password(self, user: User, request: Optional[Request] = None) -> None:
+        user_cache.delete(user.id)
+
+    async def on_after_delete(self, user: User, request: Optional[Request] = None) -> None:
+        user_cache.delete(user.id)
+        author_cache.delete(user.id)
 
 
-async def get_user_manager(user_db=Depends(user_service.get_user_db)):
+async def get_user_manager(user_db=Depends(UserService.get_user_db)):
     """
     Фактори менеджера для работы с пользователями
     """
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from fastapi_users.password import PasswordHelper
+
+from config.config import settings
+from src.services.metrics.registry import PASSWORD_QUEUE_WAIT, PASSWORD_TASKS
+
+# Создаётся отдельно в каждом процессе пула,
+# поэтому функции ниже можно передавать в ProcessPoolExecutor
+_password_helper = PasswordHelper()
+
+
+def _hash(password: str) -> str:
+    return _password_helper.hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    return _password_helper.verify_and_update(password, hashed_password)
+
+
+def _timed(function: Callable, *args) -> tuple[float, Any]:
+    # Время начала выполнения по часам системы, так как задача может выполняться в другом процессе
+    return time.time(), function(*args)
+
+
+class HasherOverloadedError(Exception):
+    pass
+
+
+class PasswordHasher:
+    """
+    Хэширование и проверка паролей в пуле потоков или процессов. Хэширование bcrypt занимает
+    сотни миллисекунд CPU и, выполняясь в цикле событий, задерживало бы
+    все остальные запросы процесса.
+    Одновременно принимается не больше workers + max_queue операций, остальные сразу отклоняются
+    """
+
+    def __init__(self, kind: str, workers: int, max_queue: int):
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+
+        self._executor: Optional[Executor] = None
+        self._tasks = 0
+
+    def _get_executor(self) -> Executor:
+        # Пул создаётся при первом использовании, уже в процессе воркера сервера
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password"
+                )
+        return self._executor
+
+    async def _run(self, operation: str, function: Callable, *args) -> Any:
+        if self._tasks >= self.workers + self.max_queue:
+            raise HasherOverloadedError()
+
+        self._tasks += 1
+        PASSWORD_TASKS.inc()
+        submitted = time.time()
+        try:
+            started, result = await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), _timed, function, *args
+            )
+        finally:
+            self._tasks -= 1
+            PASSWORD_TASKS.dec()
+
+        PASSWORD_QUEUE_WAIT.labels(operation).observe(max(started - submitted, 0))
+        return result
+
+    async def hash(self, password: str) -> str:
+        """
+        Хэширование пароля
+        :param password: Пароль
+        :return: Хэш пароля
+        :raises HasherOverloadedError: Очередь операций переполнена
+        """
+        return await self._run("hash", _hash, password)
+
+    async def verify_and_update(
+            self,
+            password: str,
+            hashed_password: str,
+    ) -> tuple[bool, Optional[str]]:
+        """
+        Проверка пароля по хэшу
+        :param password: Пароль
+        :param hashed_password: Сохранённый хэш пароля
+        :return: Совпадает ли пароль и новый хэш, если сохранённый нужно обновить
+        :raises HasherOverloadedError: Очередь операций переполнена
+        """
+        return await self._run("verify", _verify_and_update, password, hashed_password)
+
+    def stop(self) -> None:
+        """
+        Остановка пула. Не начатые операции отменяются
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    kind=settings.AUTH.PASSWORD_EXECUTOR,
+    workers=settings.AUTH.PASSWORD_WORKERS,
+    max_queue=settings.AUTH.PASSWORD_MAX_QUEUE,
+)
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+from src.enums.rating import VoteType
+from src.utils.background import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+# Ключ - (ID публикации, ID пользователя), значение - итоговая оценка либо None при отмене
+VoteChanges = dict[tuple[int, int], Optional[VoteType]]
+
+
+class VoteBuffer(BackgroundTask):
+    """
+    Буфер отложенной записи оценок. Оценки копятся в памяти процесса, повторные изменения
+    оценки одним пользователем схлопываются до итогового состояния, а в БД буфер
+    записывается одной пачкой раз в interval секунд либо при накоплении max_events изменений
+    """
+
+    def __init__(
+            self,
+            flush: Callable[[VoteChanges], Awaitable[None]],
+            interval: float,
+            max_events: int,
+    ):
+        super().__init__()
+        self.interval = interval
+        self.max_events = max_events
+
+        self._flush = flush
+        self._pending: VoteChanges = {}
+        # Изменения, которые прямо сейчас записываются в БД
+        self._flushing: VoteChanges = {}
+        self._full = asyncio.Event()
+
+    def get(self, post_id: int, user_id: int, default: Any = None) -> Any:
+        """
+        Получение ещё не записанной в БД оценки пользователя
+        :param post_id: ID публикации
+        :param user_id: ID пользователя
+        :param default: Значение, возвращаемое если в буфере нет оценки
+        :return: Тип оценки, None для отменённой оценки либо default
+        """
+        key = (post_id, user_id)
+        if key in self._pending:
+            return self._pending[key]
+        return self._flushing.get(key, default)
+
+    def add(self, post_id: int, user_id: int, vote_type: Optional[VoteType]) -> None:
+        """
+        Добавление изменения оценки в буфер
+        :param post_id: ID публикации
+        :param user_id: ID пользователя
+        :param vote_type: Тип оценки либо None для отмены оценки
+        """
+        self._pending[(post_id, user_id)] = vote_type
+        if len(self._pending) >= self.max_events:
+            self._full.set()
+
+    async def stop(self) -> None:
+        """
+        Остановка фоновой записи с записью всех накопленных изменений
+        """
+        if not self.running:
+            return
+
+        await super().stop()
+        while self._pending:
+            if not await self.flush():
+                logger.error("Dropping %s buffered votes on shutdown", len(self._pending))
+                break
+
+    async def flush(self) -> bool:
+        """
+        Запись накопленных изменений в БД. При ошибке изменения возвращаются в буфер,
+        если пользователь не успел изменить оценку ещё раз
+        :return: True, если запись прошла успешно
+        """
+        if not self._pending:
+            return True
+
+        batch, self._pending = self._pending, {}
+        self._flushing = batch
+        try:
+            await self._flush(batch)
+        except BaseException as error:
+            for key, vote_type in batch.items():
+                self._pending.setdefault(key, vote_type)
+            if not isinstance(error, Exception):
+                raise
+            logger.exception("Failed to flush %s buffered votes", len(batch))
+            return False
+        finally:
+            self._flushing = {}
+
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self.flush()
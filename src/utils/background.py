@@ -0,0 +1,47 @@
+import abc
+import asyncio
+from typing import Optional
+
+
+class BackgroundTask(abc.ABC):
+    """
+    Базовый класс для объектов с фоновой задачей в цикле событий процесса.
+    Наследники реализуют саму задачу в методе _run
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        """
+        Запущена ли фоновая задача
+        """
+        return self._task is not None
+
+    def start(self) -> None:
+        """
+        Запуск фоновой задачи, если она ещё не запущена
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Отмена фоновой задачи с ожиданием её завершения
+        """
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    @abc.abstractmethod
+    async def _run(self) -> None:
+        """
+        Тело фоновой задачи
+        """
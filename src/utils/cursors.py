@@ -0,0 +1,54 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Sequence
+
+from sqlalchemy.orm import InstrumentedAttribute
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(columns: Sequence[InstrumentedAttribute], values: Sequence[Any]) -> str:
+    """
+    Кодирование непрозрачного курсора keyset-пагинации
+    :param columns: Колонки, по которым отсортирована выборка
+    :param values: Значения этих колонок у последней выданной записи
+    :return: Курсор в виде url-safe base64 строки
+    """
+    payload = {
+        "k": [column.key for column in columns],
+        "v": [value.isoformat() if isinstance(value, datetime) else value for value in values],
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(columns: Sequence[InstrumentedAttribute], cursor: str) -> tuple:
+    """
+    Декодирование курсора keyset-пагинации
+    :param columns: Колонки, по которым отсортирована выборка
+    :param cursor: Курсор, полученный от клиента
+    :return: Значения колонок, после которых нужно продолжить выборку
+    :raises InvalidCursorError: Курсор повреждён либо выдан для другой сортировки
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        keys, values = payload["k"], payload["v"]
+    except (binascii.Error, ValueError, TypeError, KeyError) as error:
+        raise InvalidCursorError("Invalid cursor") from error
+
+    if keys != [column.key for column in columns] or len(values) != len(columns):
+        raise InvalidCursorError("Cursor doesn't match the sorting")
+
+    try:
+        return tuple(
+            datetime.fromisoformat(value) if column.type.python_type is datetime
+            else column.type.python_type(value)
+            for column, value in zip(columns, values)
+        )
+    except (ValueError, TypeError) as error:
+        raise InvalidCursorError("Invalid cursor") from error
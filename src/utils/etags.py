@@ -0,0 +1,62 @@
+import hashlib
+from typing import Optional
+
+from src.enums.rating import VoteType
+from src.models.dto.post import GetPost, PostsPage
+from src.models.dto.user import GetAuthor
+
+
+def _authors_state(authors: dict[int, GetAuthor]) -> list[tuple]:
+    return sorted((author.id, author.display_name) for author in authors.values())
+
+
+def post_etag(post: GetPost, author: Optional[GetAuthor] = None) -> str:
+    """
+    Версия публикации для заголовка ETag. Текст, автор и дата создания публикации не меняются,
+    поэтому версию определяют только ID и счётчики оценок, а также данные автора, если они выводятся
+    :param post: DTO-Модель публикации
+    :param author: Данные автора публикации, если они выводятся вместе с ней
+    :return: Значение заголовка ETag
+    """
+    if author is None:
+        return f'"{post.id}-{post.rating}-{post.votes_amount}"'
+
+    digest = hashlib.blake2b(repr(_authors_state({author.id: author})).encode(), digest_size=6)
+    return f'"{post.id}-{post.rating}-{post.votes_amount}-{digest.hexdigest()}"'
+
+
+def page_etag(
+        page: PostsPage,
+        votes: Optional[dict[int, VoteType]] = None,
+        authors: Optional[dict[int, GetAuthor]] = None,
+) -> str:
+    """
+    Версия страницы ленты для заголовка ETag: хэш состава страницы, счётчиков её публикаций
+    и курсора следующей страницы
+    :param page: Страница ленты
+    :param votes: Оценки текущего пользователя, если они выводятся вместе с лентой
+    :param authors: Данные авторов публикаций, если они выводятся вместе с лентой
+    :return: Значение заголовка ETag
+    """
+    state = [(post.id, post.rating, post.votes_amount) for post in page.posts]
+    if votes is not None:
+        state.append(sorted(votes.items()))
+    if authors is not None:
+        state.append(_authors_state(authors))
+    digest = hashlib.blake2b(repr((state, page.next_cursor)).encode(), digest_size=12)
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Проверка заголовка If-None-Match по правилам слабого сравнения из RFC 9110
+    :param if_none_match: Значение заголовка If-None-Match из запроса
+    :param etag: Текущее значение ETag ресурса
+    :return: True, если у клиента актуальная версия и можно ответить 304
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
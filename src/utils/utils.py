@@ -1,9 +1,10 @@
+from datetime import datetime, timezone
+
 from src.models.db import Post
 from src.models.dto.post import GetPost
-from src.services.db.rating import rating_service
 
 
-async def get_post_view(post: Post) -> GetPost:
+def get_post_view(post: Post) -> GetPost:
     """
     Получение DTO из БД инстанса публикации
     :param post: Объект публикации из ORM
@@ -11,9 +12,21 @@ async def get_post_view(post: Post) -> GetPost:
     о публикации которую нужно выводить в ответах API
     """
     return GetPost(
+        id=post.id,
         body=post.body,
         created=post.created,
         author_id=post.author_id,
-        votes_amount=len(await rating_service.get_post_votes(post.id)),
-        rating=await rating_service.get_post_rating(post.id),
+        votes_amount=post.votes_amount,
+        rating=post.rating,
     )
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """
+    Приведение времени к UTC без часового пояса, в котором хранятся даты в БД
+    :param value: Время с часовым поясом или без него. Время без пояса считается временем UTC
+    :return: Время UTC без часового пояса
+    """
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,92 @@
+import asyncio
+
+from src.services.cache.base import TTLCache
+
+
+def test_concurrent_misses_are_loaded_once():
+    cache = TTLCache(max_size=10, ttl=60)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_load("key", loader) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["value"] * 5
+    assert calls == 1
+    assert cache.coalesced == 4
+    assert cache.get("key") == "value"
+
+
+def test_load_invalidated_in_flight_is_not_stored():
+    cache = TTLCache(max_size=10, ttl=60)
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def loader():
+        started.set()
+        await release.wait()
+        return "stale"
+
+    async def scenario():
+        load = asyncio.create_task(cache.get_or_load("key", loader))
+        await started.wait()
+        cache.invalidate()
+        release.set()
+        return await load
+
+    assert asyncio.run(scenario()) == "stale"
+    assert cache.get("key") is None
+
+
+def test_peek_does_not_count():
+    cache = TTLCache(max_size=10, ttl=60)
+    cache.set("key", "value")
+
+    assert cache.peek("key") == "value"
+    assert cache.peek("other") is None
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_invalidate_by_predicate():
+    cache = TTLCache(max_size=10, ttl=60)
+    cache.set(("best", 1), 1)
+    cache.set(("latest", 1), 2)
+
+    cache.invalidate(lambda key: key[0] == "best")
+
+    assert cache.get(("best", 1)) is None
+    assert cache.get(("latest", 1)) == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_missing_values_are_cached_with_negative_ttl():
+    cache = TTLCache(max_size=10, ttl=60, negative_ttl=60)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+
+    async def scenario():
+        await cache.get_or_load("key", loader)
+        await cache.get_or_load("key", loader)
+
+    asyncio.run(scenario())
+
+    assert calls == 1
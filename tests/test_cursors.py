@@ -0,0 +1,33 @@
+from datetime import datetime
+
+import pytest
+
+from src.models.db import Post
+from src.utils.cursors import InvalidCursorError, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    created = datetime(2024, 2, 8, 17, 53, 6, 123456)
+    cursor = encode_cursor((Post.created, Post.id), [created, 42])
+
+    assert decode_cursor((Post.created, Post.id), cursor) == (created, 42)
+
+
+def test_cursor_for_other_sorting_is_rejected():
+    cursor = encode_cursor((Post.rating, Post.id), [10, 42])
+
+    with pytest.raises(InvalidCursorError):
+        decode_cursor((Post.created, Post.id), cursor)
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", "e30", "eyJrIjpbInJhdGluZyIsImlkIl19"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor((Post.rating, Post.id), cursor)
+
+
+def test_cursor_with_wrong_value_types_is_rejected():
+    cursor = encode_cursor((Post.rating, Post.id), ["ten", 42])
+
+    with pytest.raises(InvalidCursorError):
+        decode_cursor((Post.rating, Post.id), cursor)
@@ -0,0 +1,34 @@
+from datetime import datetime
+
+from src.models.dto.post import GetPost, PostsPage
+from src.utils.etags import etag_matches, page_etag, post_etag
+
+
+def make_post(rating: int = 0) -> GetPost:
+    return GetPost(
+        id=1,
+        body="body",
+        created=datetime(2024, 2, 8, 17, 53, 6),
+        author_id=1,
+        votes_amount=abs(rating),
+        rating=rating,
+    )
+
+
+def test_etag_matches():
+    etag = post_etag(make_post())
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
+
+
+def test_etag_changes_with_counters():
+    assert post_etag(make_post(1)) != post_etag(make_post(2))
+
+    page = PostsPage(posts=[make_post(1)], next_cursor=None)
+    changed = PostsPage(posts=[make_post(2)], next_cursor=None)
+    assert page_etag(page) == page_etag(page.model_copy())
+    assert page_etag(page) != page_etag(changed)
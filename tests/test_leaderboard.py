@@ -0,0 +1,98 @@
+import asyncio
+import random
+from typing import Optional
+
+from src.services.cache.leaderboard import Leaderboard, RatingKey
+
+
+class Ratings:
+    """
+    Рейтинги публикаций, заменяющие БД: отдают лучшие публикации так же, как запрос лидеров
+    """
+
+    def __init__(self, ratings: dict[int, int]):
+        self.ratings = ratings
+
+    async def load(self, limit: int) -> list[RatingKey]:
+        return self.expected()[:limit]
+
+    def expected(self) -> list[RatingKey]:
+        return sorted(((rating, post_id) for post_id, rating in self.ratings.items()), reverse=True)
+
+
+def walk(leaderboard: Leaderboard, amount: int) -> Optional[list[RatingKey]]:
+    """
+    Обход ленты best по страницам, пока они отдаются из списка в памяти
+    :return: Ключи всех отданных публикаций либо None, если первая страница вышла за границу
+    """
+    keys = []
+    after = None
+    while True:
+        page = leaderboard.page(amount, after)
+        if page is None:
+            return keys or None
+        keys.extend(page[:amount])
+        if len(page) <= amount:
+            return keys
+        after = page[amount - 1]
+
+
+def test_pages_match_sorted_ratings():
+    rng = random.Random(1)
+    ratings = Ratings({post_id: rng.randint(-20, 20) for post_id in range(1, 200)})
+    leaderboard = Leaderboard(ratings.load, size=30, margin=10, interval=60)
+    asyncio.run(leaderboard.resync())
+
+    for _ in range(2000):
+        post_id = rng.randint(1, 250)
+        ratings.ratings[post_id] = ratings.ratings.get(post_id, 0) + rng.choice([-2, -1, 1, 2])
+        leaderboard.update(post_id, ratings.ratings[post_id])
+
+        keys = walk(leaderboard, rng.randint(1, 15))
+        if keys is not None:
+            assert keys == ratings.expected()[:len(keys)]
+
+
+def test_page_outside_floor_is_not_served():
+    ratings = Ratings({post_id: post_id for post_id in range(1, 21)})
+    leaderboard = Leaderboard(ratings.load, size=8, margin=2, interval=60)
+    asyncio.run(leaderboard.resync())
+
+    assert leaderboard.page(5) == [(20, 20), (19, 19), (18, 18), (17, 17), (16, 16), (15, 15)]
+    assert leaderboard.page(5, (15, 15)) is None
+
+
+def test_small_table_is_served_completely():
+    ratings = Ratings({1: 3, 2: 1, 3: 2})
+    leaderboard = Leaderboard(ratings.load, size=8, margin=2, interval=60)
+    asyncio.run(leaderboard.resync())
+
+    assert leaderboard.page(5) == [(3, 1), (2, 3), (1, 2)]
+    assert leaderboard.page(5, (2, 3)) == [(1, 2)]
+
+
+def test_updates_during_resync_are_applied():
+    ratings = Ratings({1: 1, 2: 2, 3: 3})
+    loaded = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_load(limit: int) -> list[RatingKey]:
+        # Список читается из БД до оценки, пришедшей во время загрузки
+        keys = await ratings.load(limit)
+        loaded.set()
+        await release.wait()
+        return keys
+
+    leaderboard = Leaderboard(slow_load, size=8, margin=2, interval=60)
+
+    async def scenario():
+        resync = asyncio.create_task(leaderboard.resync())
+        await loaded.wait()
+        ratings.ratings[1] = 10
+        leaderboard.update(1, 10)
+        release.set()
+        await resync
+
+    asyncio.run(scenario())
+
+    assert leaderboard.page(5) == [(10, 1), (3, 3), (2, 2)]
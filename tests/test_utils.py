@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from pydantic import TypeAdapter
+
+from src.utils.utils import to_naive_utc
+
+datetime_adapter = TypeAdapter(datetime)
+
+
+def test_to_naive_utc_converts_aware_values():
+    utc = datetime_adapter.validate_python("2024-02-08T17:53:06Z")
+    moscow = datetime_adapter.validate_python("2024-02-08T17:53:06+03:00")
+
+    assert to_naive_utc(utc) == datetime(2024, 2, 8, 17, 53, 6)
+    assert to_naive_utc(moscow) == datetime(2024, 2, 8, 14, 53, 6)
+
+
+def test_to_naive_utc_keeps_naive_values():
+    value = datetime(2024, 2, 8, 17, 53, 6)
+    assert to_naive_utc(value) is value